@@ -1,161 +1,1476 @@
-from flask import Flask, request, jsonify, send_file
+from flask import (Flask, request, jsonify, send_file, g, has_request_context, make_response,
+                   Response, stream_with_context)
 from flask_cors import CORS
 import PyPDF2
+from PyPDF2.generic import ArrayObject, DictionaryObject, NameObject, NumberObject
 import io
 import fitz  # PyMuPDF
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.section import WD_SECTION
 from docx.oxml.shared import OxmlElement, qn
+from docx.oxml import parse_xml
+from xml.sax.saxutils import escape as xml_escape
 import pandas as pd
-from reportlab.pdfgen import canvas
+import numpy as np
 from reportlab.lib.pagesizes import letter, A4, legal
+import os
+import json
+import re
+import time
+import hashlib
+import heapq
+import itertools
+import tempfile
+import threading
+import functools
+import contextlib
+import contextvars
+import inspect
+import unicodedata
 import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from PIL import Image
 
+from docx_renderer import DocxRenderer, warm_fonts
+
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Original-Size', 'X-Compressed-Size'])
+
+# OCR settings (override with environment variables)
+OCR_DPI = int(os.environ.get('PDFGEARS_OCR_DPI', 300))
+OCR_WORKERS = int(os.environ.get('PDFGEARS_OCR_WORKERS', os.cpu_count() or 1))
+# A page counts as scanned when images cover at least this share of it and it has
+# fewer than SCAN_MIN_CHARS characters of real text
+SCAN_IMAGE_COVERAGE = float(os.environ.get('PDFGEARS_SCAN_IMAGE_COVERAGE', 0.5))
+SCAN_MIN_CHARS = int(os.environ.get('PDFGEARS_SCAN_MIN_CHARS', 50))
+TEXT_OPERATOR = re.compile(rb'(?<![A-Za-z])BT(?![A-Za-z])')
+# Indirect object references ("12 0 R") in a PDF object definition
+PDF_REFERENCE = re.compile(r'(\d+) \d+ R\b')
+# Bullets and list numbers ("•", "-", "3.", "(a)", "iv)") that start a new paragraph in PDF to Word
+LIST_MARKER = re.compile(r'^\s*(?:[\u2022\u25aa\u25e6\u2023\u2043\u2013*-]|\(?(?:\d{1,3}|[a-zA-Z]|[ivxIVX]{1,4})[.)])\s')
+
+# PyMuPDF base-14 font names by family, indexed by bold + 2 * italic, for measuring extracted text
+BASE14_FONTS = {
+    'sans': ('helv', 'hebo', 'heit', 'hebi'),
+    'serif': ('tiro', 'tibo', 'tiit', 'tibi'),
+    'mono': ('cour', 'cobo', 'coit', 'cobi'),
+}
+# Control characters that are not allowed in DOCX XML
+XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+WORD_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+# pdf2docx layout parsing: documents with at least LAYOUT_PAGES_PER_WORKER pages per
+# worker are parsed across up to LAYOUT_WORKERS processes
+LAYOUT_WORKERS = int(os.environ.get('PDFGEARS_LAYOUT_WORKERS', os.cpu_count() or 1))
+LAYOUT_PAGES_PER_WORKER = int(os.environ.get('PDFGEARS_LAYOUT_PAGES_PER_WORKER', 10))
+# Native pages with at least this many vector drawings (table rules, boxes) go through pdf2docx
+LAYOUT_MIN_DRAWINGS = int(os.environ.get('PDFGEARS_LAYOUT_MIN_DRAWINGS', 4))
+
+# Page rendering settings
+RENDER_WORKERS = int(os.environ.get('PDFGEARS_RENDER_WORKERS', os.cpu_count() or 1))
+RENDER_MAX_INFLIGHT_BYTES = int(os.environ.get('PDFGEARS_RENDER_MAX_INFLIGHT_MB', 512)) * 1024 * 1024
+# Selections smaller than this are rendered in the request process; starting a pool costs more
+RENDER_MIN_PARALLEL_PAGES = int(os.environ.get('PDFGEARS_RENDER_MIN_PARALLEL_PAGES', 8))
+
+# Compression levels: images above dpi_threshold are resampled to dpi_target and
+# re-encoded as JPEG at the given quality; None leaves images untouched
+COMPRESSION_LEVELS = {
+    'lossless': {'dpi_threshold': None, 'dpi_target': None, 'quality': None, 'subset_fonts': False, 'strip_metadata': False},
+    'balanced': {'dpi_threshold': 225, 'dpi_target': 150, 'quality': 75, 'subset_fonts': True, 'strip_metadata': True},
+    'aggressive': {'dpi_threshold': 110, 'dpi_target': 96, 'quality': 50, 'subset_fonts': True, 'strip_metadata': True},
+}
+# Names used by the frontend's compression dialog
+COMPRESSION_LEVEL_ALIASES = {'low': 'lossless', 'medium': 'balanced', 'high': 'aggressive'}
+DEFAULT_COMPRESSION_LEVEL = 'balanced'
+
+# Merge settings: the output is checkpointed to disk every MERGE_CHECKPOINT_PAGES pages,
+# and results up to MERGE_SPOOL_BYTES are returned from memory rather than a temp file
+MERGE_CHECKPOINT_PAGES = int(os.environ.get('PDFGEARS_MERGE_CHECKPOINT_PAGES', 200))
+MERGE_SPOOL_BYTES = int(os.environ.get('PDFGEARS_MERGE_SPOOL_MB', 32)) * 1024 * 1024
+
+# Images to PDF: JPEG and JPEG 2000 inputs are embedded unchanged; other images are decoded and
+# re-encoded as JPEG across IMAGE_WORKERS threads, at most IMAGE_WORKERS * 2 at a time. The output
+# is checkpointed to disk every IMAGE_CHECKPOINT_BYTES of embedded image data
+IMAGE_WORKERS = int(os.environ.get('PDFGEARS_IMAGE_WORKERS', os.cpu_count() or 1))
+IMAGE_JPEG_QUALITY = int(os.environ.get('PDFGEARS_IMAGE_JPEG_QUALITY', 85))
+IMAGE_CHECKPOINT_BYTES = int(os.environ.get('PDFGEARS_IMAGE_CHECKPOINT_MB', 64)) * 1024 * 1024
+IMAGE_PASSTHROUGH_FORMATS = ('JPEG', 'JPEG2000')
+
+# Word to PDF: documents are laid out by docx_renderer across WORD_WORKERS long-lived processes,
+# started with the server and warmed with the common fonts (font lookup is configured there)
+WORD_WORKERS = int(os.environ.get('PDFGEARS_WORD_WORKERS', os.cpu_count() or 1))
+WARM_FONTS = ('Calibri', 'Cambria', 'Arial', 'Times New Roman', 'Courier New')
+
+# Split modes: every N pages, at each top-level bookmark, or by output size
+SPLIT_MODES = ('pages', 'bookmarks', 'size')
+
+# Table extraction settings
+TABLE_MIN_ROWS = 2
+TABLE_MIN_COLUMNS = 2
+# A run of x positions covered by at most this share of a table's rows separates two columns
+TABLE_GAP_COVERAGE = 0.1
+NUMBER_PATTERN = re.compile(
+    r'^(?P<open>\()?(?P<sign>[-+])?[$€£¥]?\s?(?P<digits>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)'
+    r'(?(open)\))(?P<trailing>-)?$'
+)
+
+# Result cache settings
+CACHE_MEMORY_BYTES = int(os.environ.get('PDFGEARS_CACHE_MEMORY_MB', 256)) * 1024 * 1024
+CACHE_DISK_BYTES = int(os.environ.get('PDFGEARS_CACHE_DISK_MB', 2048)) * 1024 * 1024
+CACHE_TTL = int(os.environ.get('PDFGEARS_CACHE_TTL', 3600))
+CACHE_DIR = os.environ.get('PDFGEARS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pdfgears-cache'))
+
+# Batch protect/unlock: files are processed across BATCH_WORKERS processes, at most
+# BATCH_WORKERS * 2 files in flight
+BATCH_WORKERS = int(os.environ.get('PDFGEARS_BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_MANIFEST = 'manifest.json'
+
+# Thumbnail settings
+THUMBNAIL_CACHE_BYTES = int(os.environ.get('PDFGEARS_THUMBNAIL_CACHE_MB', 64)) * 1024 * 1024
+THUMBNAIL_BATCH_LIMIT = 50
+
+# Document store settings (uploads kept parsed between requests)
+DOCUMENT_STORE_LIMIT = int(os.environ.get('PDFGEARS_DOCUMENT_STORE_LIMIT', 32))
+DOCUMENT_STORE_BYTES = int(os.environ.get('PDFGEARS_DOCUMENT_STORE_MB', 1024)) * 1024 * 1024
+DOCUMENT_TTL = int(os.environ.get('PDFGEARS_DOCUMENT_TTL', 1800))
+
+# Background job settings
+JOB_WORKERS = int(os.environ.get('PDFGEARS_JOB_WORKERS', 2))
+JOB_TTL = int(os.environ.get('PDFGEARS_JOB_TTL', 24 * 3600))
+JOB_DIR = os.environ.get('PDFGEARS_JOB_DIR', os.path.join(tempfile.gettempdir(), 'pdfgears-jobs'))
+
+# Instrumentation settings
+TIMING_HEADER = os.environ.get('PDFGEARS_TIMING_HEADER', '').lower() in ('1', 'true', 'yes')
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+class Metrics:
+    """Operation, stage and request timings plus page/byte counters, in Prometheus text format"""
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+        self._counters = {}  # (name, labels) -> value
+    
+    def observe(self, name, labels, seconds):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            values = self._histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+            values[-2] += 1
+            values[-1] += seconds
+    
+    def add(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+    
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        
+        seen = set()
+        for (name, labels), values in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} histogram')
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{name}_bucket{self._labels(labels, [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{self._labels(labels, [("le", "+Inf")])} {values[-2]}')
+            lines.append(f'{name}_count{self._labels(labels)} {values[-2]}')
+            lines.append(f'{name}_sum{self._labels(labels)} {values[-1]:.6f}')
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{self._labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(LATENCY_BUCKETS)
+
+# Name of the PDFProcessor operation currently running, used to label stage spans
+_current_operation = contextvars.ContextVar('pdfgears_operation', default=None)
+
+@contextlib.contextmanager
+def timed(stage):
+    """Record how long a stage of the current operation takes"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe('pdfgears_stage_seconds',
+                        {'operation': _current_operation.get() or 'request', 'stage': stage}, elapsed)
+        if has_request_context():
+            g.setdefault('timings', []).append((stage, elapsed))
+
+def count_pages(pages):
+    """Add to the page counter of the current operation"""
+    metrics.add('pdfgears_pages_total', {'operation': _current_operation.get() or 'request'}, pages)
+
+def _payload_size(value):
+    """Best-effort byte size of an operation's input or output"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, ParsedDocument):
+        return len(value.data)
+    if isinstance(value, io.BytesIO):
+        return value.getbuffer().nbytes
+    if hasattr(value, 'seek') and hasattr(value, 'tell'):
+        # Uploads and spooled files: measure without reading
+        position = value.tell()
+        size = value.seek(0, io.SEEK_END)
+        value.seek(position)
+        return size
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_size(item) for item in value)
+    return 0
+
+def instrumented(operation):
+    """Time a PDFProcessor operation and count its bytes in/out; generators are timed as they are consumed"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            labels = {'operation': operation}
+            if args:
+                metrics.add('pdfgears_bytes_in_total', labels, _payload_size(args[0]))
+            
+            started = time.perf_counter()
+            token = _current_operation.set(operation)
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                metrics.observe('pdfgears_operation_seconds', dict(labels, status='error'),
+                                time.perf_counter() - started)
+                raise
+            finally:
+                _current_operation.reset(token)
+            
+            if inspect.isgenerator(result):
+                return _instrument_stream(operation, result, started)
+            
+            metrics.observe('pdfgears_operation_seconds', dict(labels, status='ok'), time.perf_counter() - started)
+            metrics.add('pdfgears_bytes_out_total', labels, _payload_size(result))
+            return result
+        return wrapper
+    return decorator
+
+def _instrument_stream(operation, iterator, started):
+    """Run each step of a streamed operation under its operation label"""
+    labels = {'operation': operation}
+    status = 'error'
+    try:
+        while True:
+            token = _current_operation.set(operation)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                _current_operation.reset(token)
+            data = item[-1] if isinstance(item, tuple) else item
+            metrics.add('pdfgears_bytes_out_total', labels, _payload_size(data))
+            yield item
+        status = 'ok'
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+        metrics.observe('pdfgears_operation_seconds', dict(labels, status=status), time.perf_counter() - started)
+
+# Per-process state for OCR pool workers
+_ocr_document = None
+
+def _ocr_worker_init(pdf_bytes):
+    """Open the PDF once in each OCR worker process"""
+    global _ocr_document
+    _ocr_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+def _ocr_worker_page(page_index):
+    """Rasterize and OCR a single page, returning (text, error)"""
+    try:
+        import pytesseract
+        
+        page = _ocr_document.load_page(page_index)
+        # Tesseract binarizes on luminance anyway, so render grayscale to keep the page small
+        pix = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY, alpha=False)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        pix = None
+        return pytesseract.image_to_string(image, lang='eng'), None
+    except Exception as e:
+        return None, str(e)
+
+# Per-process state for pdf2docx layout workers
+_layout_pdf_bytes = None
+
+def _layout_worker_init(pdf_bytes):
+    """Keep the PDF bytes in each layout worker process"""
+    global _layout_pdf_bytes
+    _layout_pdf_bytes = pdf_bytes
+
+def _layout_worker_pages(page_indexes, settings):
+    """Parse a run of pages with pdf2docx, returning their layouts in pdf2docx's store() format"""
+    from pdf2docx import Converter
+    
+    with contextlib.closing(Converter(stream=_layout_pdf_bytes)) as converter:
+        converter.load_pages(pages=page_indexes).parse_document(**settings).parse_pages(**settings)
+        return [page.store() for page in converter.pages if page.finalized]
+
+# Per-process state for render pool workers
+_render_document = None
+
+def _render_worker_init(pdf_bytes):
+    """Open the PDF once in each render worker process"""
+    global _render_document
+    _render_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+def _render_worker_pages(page_numbers, zoom, image_format, jpg_quality):
+    """Render a run of pages in this worker, returning [(page_num, image_bytes)]"""
+    return [(page_num, _render_page(_render_document, page_num, zoom, image_format, jpg_quality))
+            for page_num in page_numbers]
+
+def _render_page(pdf_document, page_num, zoom, image_format, jpg_quality):
+    page = pdf_document.load_page(page_num - 1)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    if image_format == 'jpg':
+        if jpg_quality is None:
+            return pix.tobytes("jpeg")
+        return pix.tobytes("jpeg", jpg_quality=jpg_quality)
+    return pix.tobytes("png")
+
+def render_pages_parallel(document, page_numbers, zoom, image_format='png', jpg_quality=None,
+                          workers=None, max_inflight_bytes=None):
+    """Render pages across a process pool, yielding (page_num, image_bytes) in the requested order.
+    
+    Pages are handed out as contiguous runs; each worker opens the document once. New runs are
+    only submitted while the estimated pixmap memory of the runs in flight stays under the cap.
+    Selections under RENDER_MIN_PARALLEL_PAGES pages are rendered here without a pool.
+    """
+    from collections import deque
+    
+    workers = workers or RENDER_WORKERS
+    max_inflight_bytes = max_inflight_bytes or RENDER_MAX_INFLIGHT_BYTES
+    page_numbers = list(page_numbers)
+    pdf_document = document.fitz_doc
+    
+    count_pages(len(page_numbers))
+    
+    if workers <= 1 or len(page_numbers) < max(RENDER_MIN_PARALLEL_PAGES, 2):
+        for page_num in page_numbers:
+            with timed('render'):
+                img_data = _render_page(pdf_document, page_num, zoom, image_format, jpg_quality)
+            yield page_num, img_data
+        return
+    
+    def pixmap_bytes(page_num):
+        rect = pdf_document.page_cropbox(page_num - 1)
+        return int(rect.width * zoom) * int(rect.height * zoom) * 3
+    
+    # A few runs per worker keeps the pool busy without splitting the document too finely
+    run_length = max(1, len(page_numbers) // (workers * 4))
+    runs = [page_numbers[i:i + run_length] for i in range(0, len(page_numbers), run_length)]
+    run_sizes = [sum(pixmap_bytes(page_num) for page_num in run) for run in runs]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(runs)), initializer=_render_worker_init,
+                             initargs=(document.data,)) as executor:
+        pending = deque()
+        inflight = 0
+        next_run = 0
+        while next_run < len(runs) or pending:
+            while next_run < len(runs) and (not pending or inflight + run_sizes[next_run] <= max_inflight_bytes):
+                future = executor.submit(_render_worker_pages, runs[next_run], zoom, image_format, jpg_quality)
+                pending.append((future, run_sizes[next_run]))
+                inflight += run_sizes[next_run]
+                next_run += 1
+            
+            future, size = pending.popleft()
+            with timed('render'):
+                results = future.result()
+            for page_num, img_data in results:
+                yield page_num, img_data
+            inflight -= size
+
+# Long-lived pool for word_to_pdf, created on first use (or at startup) and kept warm
+_word_pool = None
+_word_pool_lock = threading.Lock()
+
+def _word_worker_init():
+    """Register the common fonts before a word_to_pdf worker takes its first document"""
+    warm_fonts(WARM_FONTS)
+
+def _word_worker_render(data):
+    return DocxRenderer(data).render()
+
+def word_pool():
+    """The shared word_to_pdf process pool, with every worker started and warmed"""
+    global _word_pool
+    with _word_pool_lock:
+        if _word_pool is None:
+            _word_pool = ProcessPoolExecutor(max_workers=WORD_WORKERS, initializer=_word_worker_init)
+            # Workers are only spawned as tasks arrive, so start them all now
+            for future in [_word_pool.submit(int) for _ in range(WORD_WORKERS)]:
+                future.result()
+        return _word_pool
+
+def _reset_word_pool(pool):
+    """Drop a broken pool so the next conversion starts a fresh one"""
+    global _word_pool
+    with _word_pool_lock:
+        if _word_pool is pool:
+            _word_pool = None
+    pool.shutdown(wait=False)
+
+class ParsedDocument:
+    """An uploaded PDF read once into memory and parsed lazily, at most once per library"""
+    
+    def __init__(self, source, password=None):
+        if isinstance(source, (bytes, bytearray)):
+            self.data = bytes(source)
+        else:
+            source.seek(0)
+            self.data = source.read()
+        
+        self._fitz_doc = None
+        self._reader = None
+        self.parses = 0
+        self.parses_avoided = 0
+        self._pins = 0
+        self._close_pending = False
+        self._pin_lock = threading.Lock()
+        self._digest = None
+        self.decrypted = False
+        # PyMuPDF documents must not be used from two threads at once
+        self.lock = threading.RLock()
+        
+        # Register with the current request so the counters end up in the response
+        if has_request_context():
+            g.setdefault('parsed_documents', []).append(self)
+        
+        if password:
+            self._decrypt(password)
+    
+    def _decrypt(self, password):
+        """Swap encrypted bytes for their decrypted form, so every library, worker process and
+        output sees a plain PDF; unencrypted files are left as they are"""
+        with timed('decrypt'):
+            pdf_document = fitz.open(stream=self.data, filetype="pdf")
+            self.parses += 1
+            if pdf_document.needs_pass and not pdf_document.authenticate(password):
+                pdf_document.close()
+                raise InvalidPasswordError("Invalid password")
+            if not (pdf_document.metadata or {}).get('encryption'):
+                self._fitz_doc = pdf_document
+                return
+            try:
+                self.data = pdf_document.tobytes(encryption=fitz.PDF_ENCRYPT_NONE)
+            finally:
+                pdf_document.close()
+        self.decrypted = True
+    
+    @classmethod
+    def of(cls, source):
+        """Wrap an upload unless it is already a parsed document"""
+        return source if isinstance(source, cls) else cls(source)
+    
+    @property
+    def digest(self):
+        """SHA-256 of the uploaded bytes"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+    
+    @property
+    def fitz_doc(self):
+        """PyMuPDF document, opened on first use"""
+        if self._fitz_doc is None:
+            with timed('open'):
+                pdf_document = fitz.open(stream=self.data, filetype="pdf")
+            self.parses += 1
+            if pdf_document.needs_pass:
+                pdf_document.close()
+                raise InvalidPasswordError(PASSWORD_REQUIRED)
+            self._fitz_doc = pdf_document
+        else:
+            self.parses_avoided += 1
+        return self._fitz_doc
+    
+    def open_copy(self):
+        """A private PyMuPDF document over the same bytes, for operations that modify it"""
+        with timed('open'):
+            pdf_document = fitz.open(stream=self.data, filetype="pdf")
+        self.parses += 1
+        if pdf_document.needs_pass:
+            pdf_document.close()
+            raise InvalidPasswordError(PASSWORD_REQUIRED)
+        return pdf_document
+    
+    def view(self):
+        """A request-private document over the same bytes, with its own lazily parsed handles
+        
+        Long operations on a stored document work on a view, so they never hold the shared
+        handle's lock while short requests (thumbnails, page lookups) wait for it.
+        """
+        view = ParsedDocument(self.data)
+        view._digest = self._digest
+        view.decrypted = self.decrypted
+        return view
+    
+    @property
+    def reader(self):
+        """PyPDF2 reader, opened on first use"""
+        if self._reader is None:
+            with timed('open'):
+                self._reader = PyPDF2.PdfReader(self.stream())
+            self.parses += 1
+        else:
+            self.parses_avoided += 1
+        return self._reader
+    
+    def stream(self):
+        """New file-like view over the buffer (no copy)"""
+        return io.BytesIO(self.data)
+    
+    def pin(self):
+        """Keep the document open while it is in use: by a streamed response, the document
+        store or a request working on a stored document"""
+        with self._pin_lock:
+            self._pins += 1
+    
+    def release(self):
+        with self._pin_lock:
+            self._pins -= 1
+            if self._pins or not self._close_pending:
+                return
+        self.close()
+    
+    def close(self):
+        """Close the parsed handles, or once the last pin is released"""
+        with self._pin_lock:
+            if self._pins:
+                self._close_pending = True
+                return
+            self._close_pending = False
+            pdf_document, self._fitz_doc = self._fitz_doc, None
+            self._reader = None
+        if pdf_document is not None:
+            pdf_document.close()
+
+class ResultCache:
+    """Conversion results keyed by upload content, in a memory LRU tier and a disk tier"""
+    
+    def __init__(self, memory_bytes, disk_bytes, ttl, directory):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (data, meta, expires)
+        self._memory_size = 0
+        self._disk = OrderedDict()  # key -> (size, expires)
+        self._disk_size = 0
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                       'stores': 0, 'memory_evictions': 0, 'disk_evictions': 0, 'expired': 0}
+        self._load_disk_index()
+    
+    @staticmethod
+    def key(operation, uploads, params):
+        """SHA-256 over the uploaded bytes plus the normalized operation parameters"""
+        digest = hashlib.sha256(operation.encode('utf-8'))
+        for upload in uploads:
+            upload.seek(0)
+            for chunk in iter(lambda: upload.read(1024 * 1024), b''):
+                digest.update(chunk)
+            upload.seek(0)
+            digest.update(b'\0')
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+    
+    @property
+    def max_entry_bytes(self):
+        return max(self.memory_bytes, self.disk_bytes)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+    
+    def _load_disk_index(self):
+        """Pick up entries left on disk by a previous run, oldest first"""
+        if not self.disk_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                # Spool files of responses that were interrupted before a restart
+                try:
+                    os.unlink(self._path(name))
+                except OSError:
+                    pass
+                continue
+            if not name.endswith('.json'):
+                continue
+            key = name[:-5]
+            try:
+                with open(self._path(name), 'r') as f:
+                    expires = json.load(f)['expires']
+                size = os.path.getsize(self._path(key + '.bin'))
+                entries.append((os.path.getmtime(self._path(key + '.bin')), key, size, expires))
+            except (OSError, ValueError, KeyError):
+                continue
+        for _, key, size, expires in sorted(entries):
+            self._disk[key] = (size, expires)
+            self._disk_size += size
+    
+    def get(self, key):
+        """Return (data, meta) for a live entry, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['memory_hits'] += 1
+                    return entry[0], entry[1]
+                self._drop_memory(key)
+                self._stats['expired'] += 1
+            
+            disk_entry = self._disk.get(key)
+            if disk_entry is not None:
+                if disk_entry[1] > now:
+                    try:
+                        with open(self._path(key + '.bin'), 'rb') as f:
+                            data = f.read()
+                        with open(self._path(key + '.json'), 'r') as f:
+                            meta = json.load(f)['meta']
+                    except (OSError, ValueError, KeyError):
+                        self._drop_disk(key)
+                    else:
+                        self._disk.move_to_end(key)
+                        self._stats['hits'] += 1
+                        self._stats['disk_hits'] += 1
+                        self._store_memory(key, data, meta, disk_entry[1])
+                        return data, meta
+                else:
+                    self._drop_disk(key)
+                    self._stats['expired'] += 1
+            
+            self._stats['misses'] += 1
+            return None
+    
+    def put(self, key, data, meta):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._stats['stores'] += 1
+            self._store_memory(key, data, meta, expires)
+            self._store_disk(key, data, meta, expires)
+    
+    def store_stream(self, key, chunks, meta):
+        """Pass chunks of a streamed response through, spooling them into the disk tier"""
+        if not self.disk_bytes:
+            try:
+                yield from chunks
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+            return
+        temp_path = self._path(key + '.bin.%d.tmp' % threading.get_ident())
+        size = 0
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            spool = open(temp_path, 'wb')
+        except OSError:
+            spool = None
+        try:
+            for chunk in chunks:
+                if spool is not None:
+                    size += len(chunk)
+                    if size > self.disk_bytes:
+                        spool.close()
+                        os.unlink(temp_path)
+                        spool = None
+                    else:
+                        spool.write(chunk)
+                yield chunk
+            # Only reached when the whole response was produced
+            if spool is not None:
+                spool.close()
+                self._commit_spool(key, temp_path, size, meta)
+                spool = None
+        finally:
+            if spool is not None:
+                # The client went away or the response was not read to the end
+                spool.close()
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+            # Close the wrapped file or generator, which the response can no longer reach
+            if hasattr(chunks, 'close'):
+                chunks.close()
+    
+    def _commit_spool(self, key, temp_path, size, meta):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._stats['stores'] += 1
+            self._drop_disk(key)
+            try:
+                with open(self._path(key + '.json'), 'w') as f:
+                    json.dump({'meta': meta, 'expires': expires}, f)
+                os.replace(temp_path, self._path(key + '.bin'))
+            except OSError:
+                for path in (temp_path, self._path(key + '.json')):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                return
+            self._disk[key] = (size, expires)
+            self._disk_size += size
+            while self._disk_size > self.disk_bytes:
+                self._drop_disk(next(iter(self._disk)))
+                self._stats['disk_evictions'] += 1
+    
+    def _store_memory(self, key, data, meta, expires):
+        if len(data) > self.memory_bytes:
+            return
+        self._drop_memory(key)
+        self._memory[key] = (data, meta, expires)
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            self._drop_memory(next(iter(self._memory)))
+            self._stats['memory_evictions'] += 1
+    
+    def _store_disk(self, key, data, meta, expires):
+        if len(data) > self.disk_bytes:
+            return
+        self._drop_disk(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for suffix, payload, mode in (('.bin', data, 'wb'),
+                                          ('.json', json.dumps({'meta': meta, 'expires': expires}), 'w')):
+                temp_path = self._path(key + suffix + '.tmp')
+                with open(temp_path, mode) as f:
+                    f.write(payload)
+                os.replace(temp_path, self._path(key + suffix))
+        except OSError:
+            return
+        self._disk[key] = (len(data), expires)
+        self._disk_size += len(data)
+        while self._disk_size > self.disk_bytes:
+            self._drop_disk(next(iter(self._disk)))
+            self._stats['disk_evictions'] += 1
+    
+    def _drop_memory(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= len(entry[0])
+    
+    def _drop_disk(self, key):
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self._disk_size -= entry[0]
+        for suffix in ('.bin', '.json'):
+            try:
+                os.unlink(self._path(key + suffix))
+            except OSError:
+                pass
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._stats,
+                        memory_entries=len(self._memory), memory_bytes=self._memory_size,
+                        disk_entries=len(self._disk), disk_bytes=self._disk_size)
+
+result_cache = ResultCache(CACHE_MEMORY_BYTES, CACHE_DISK_BYTES, CACHE_TTL, CACHE_DIR)
+
+# Rendered page previews keyed by document hash, page and scale (memory tier only)
+thumbnail_cache = ResultCache(THUMBNAIL_CACHE_BYTES, 0, CACHE_TTL, CACHE_DIR)
+
+class DocumentNotFoundError(Exception):
+    pass
+
+PASSWORD_REQUIRED = "This PDF is password protected, send its password"
+
+class InvalidPasswordError(Exception):
+    pass
+
+class DocumentStore:
+    """Uploaded documents kept parsed in memory between requests, in an LRU with a TTL"""
+    
+    def __init__(self, max_documents, max_bytes, ttl):
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._documents = OrderedDict()  # handle -> (document, expires)
+        self._size = 0
+    
+    def add(self, document, handle=None):
+        """Keep a document warm and return its handle (the content hash unless given)"""
+        handle = handle or document.digest
+        with self._lock:
+            self._expire()
+            entry = self._documents.get(handle)
+            if entry is None or entry[0] is not document:
+                if entry is not None:
+                    self._drop(handle)
+                document.pin()
+                self._size += len(document.data)
+            self._documents[handle] = (document, time.time() + self.ttl)
+            self._documents.move_to_end(handle)
+            while len(self._documents) > self.max_documents or self._size > self.max_bytes:
+                oldest = next(iter(self._documents))
+                if oldest == handle:
+                    break
+                self._drop(oldest)
+        return handle
+    
+    def get(self, handle, pin=False):
+        """Return the stored document and extend its lifetime, or None
+        
+        With pin, the document is pinned before an eviction can close it; the caller releases it.
+        """
+        with self._lock:
+            self._expire()
+            entry = self._documents.get(handle)
+            if entry is None:
+                return None
+            self._documents[handle] = (entry[0], time.time() + self.ttl)
+            self._documents.move_to_end(handle)
+            if pin:
+                entry[0].pin()
+            return entry[0]
+    
+    def remove(self, handle):
+        with self._lock:
+            if handle not in self._documents:
+                return False
+            self._drop(handle)
+            return True
+    
+    def _expire(self):
+        now = time.time()
+        for handle in [h for h, (_, expires) in self._documents.items() if expires <= now]:
+            self._drop(handle)
+    
+    def _drop(self, handle):
+        document, _ = self._documents.pop(handle)
+        self._size -= len(document.data)
+        # Requests still using the document hold a pin, which defers the close until they finish
+        document.release()
+        document.close()
+    
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._documents), 'bytes': self._size}
+
+document_store = DocumentStore(DOCUMENT_STORE_LIMIT, DOCUMENT_STORE_BYTES, DOCUMENT_TTL)
+
+def request_document(password_field='password', shared=False):
+    """The PDF for this request: a `document` handle from /api/documents, or the uploaded `file`
+    
+    An uploaded file sent with a password is decrypted once and kept in the document store under
+    its encrypted bytes and password, so a chain of requests on a protected PDF reuses it.
+    
+    A stored document comes back as a private view unless shared is set. Routes that only touch
+    a page or two pass shared to reuse the parsed handle, holding its lock until teardown.
+    """
+    handle = request.form.get('document') or request.args.get('document')
+    if handle:
+        if not shared:
+            document = document_store.get(handle)
+            if document is None:
+                raise DocumentNotFoundError('Unknown or expired document handle, upload the PDF again')
+            return document.view()
+        document = document_store.get(handle, pin=True)
+        if document is None:
+            raise DocumentNotFoundError('Unknown or expired document handle, upload the PDF again')
+        return _lock_stored_document(document)
+    
+    upload = request.files['file']
+    password = request.form.get(password_field)
+    if not password:
+        return ParsedDocument(upload)
+    
+    key = hashlib.sha256(password.encode('utf-8'))
+    upload.seek(0)
+    for chunk in iter(lambda: upload.read(1024 * 1024), b''):
+        key.update(chunk)
+    key = 'decrypted-' + key.hexdigest()
+    document = document_store.get(key, pin=shared)
+    if document is None:
+        document = ParsedDocument(upload, password)
+        if not document.decrypted:
+            return document
+        document_store.add(document, key)
+        if shared:
+            document.pin()
+    return _lock_stored_document(document) if shared else document.view()
+
+def _lock_stored_document(document):
+    """Hold a pinned stored document for the rest of the request
+    
+    Stored documents are shared between requests. The caller's pin (document_store.get(pin=True))
+    keeps an eviction from closing it under this request; the lock is held until teardown, which
+    releases both.
+    """
+    if not g.get('document_locks'):
+        g.document_locks = []
+    document.lock.acquire()
+    g.document_locks.append(document)
+    return document
+
+class ZipStream:
+    """Write-only sink for zipfile that hands back the bytes written so far"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(entries):
+    """Yield a ZIP archive chunk by chunk from (name, data) pairs"""
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, 'w') as zip_file:
+        for name, data in entries:
+            zip_file.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
+
+def stream_multipart(entries, boundary):
+    """Yield a multipart/mixed body part by part from (filename, mimetype, data) triples"""
+    for filename, mimetype, data in entries:
+        yield (f'--{boundary}\r\n'
+               f'Content-Type: {mimetype}\r\n'
+               f'Content-Disposition: attachment; filename="{filename}"\r\n'
+               f'Content-Length: {len(data)}\r\n\r\n').encode('ascii')
+        yield data
+        yield b'\r\n'
+    yield f'--{boundary}--\r\n'.encode('ascii')
+
+def page_files_response(pages, json_key, mimetype):
+    """Send (page_num, filename, data) triples as a ZIP, multipart/mixed or base64 JSON per the Accept header"""
+    import base64
+    import uuid
+    
+    transport = request.accept_mimetypes.best_match(
+        ['application/json', 'application/zip', 'multipart/mixed'], default='application/json')
+    
+    if transport == 'application/zip':
+        entries = ((filename, data) for _, filename, data in pages)
+        return Response(stream_with_context(stream_zip(entries)), mimetype='application/zip',
+                        headers={'Content-Disposition': f'attachment; filename={json_key}.zip'})
+    
+    if transport == 'multipart/mixed':
+        boundary = uuid.uuid4().hex
+        entries = ((filename, mimetype, data) for _, filename, data in pages)
+        return Response(stream_with_context(stream_multipart(entries, boundary)),
+                        content_type=f'multipart/mixed; boundary={boundary}')
+    
+    # Legacy JSON body with base64 page data
+    return jsonify({json_key: [{
+        'page_num': page_num,
+        'filename': filename,
+        'data': base64.b64encode(data).decode('utf-8')
+    } for page_num, filename, data in pages]})
+
+def _normalize_param(name, value):
+    """Canonical form of an operation parameter so equivalent requests share a cache key"""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if name == 'format':
+        return 'jpg' if value == 'jpeg' else value
+    if name in ('quality', 'page_num', 'every'):
+        return str(int(value))
+    if name == 'dpi':
+        return str(int(value or 0))
+    if name == 'rotation':
+        return str(int(value) % 360)
+    if name == 'rotations':
+        return json.dumps(json.loads(value), separators=(',', ':'))
+    if name == 'compression_level':
+        return COMPRESSION_LEVEL_ALIASES.get(value, value)
+    if name == 'pages':
+        return value.lower().replace(' ', '')
+    return value
+
+# Response headers kept alongside a cached result
+CACHED_HEADERS = ('Content-Disposition', 'X-Original-Size', 'X-Compressed-Size')
+
+def _decrypts_upload():
+    """Whether this request works on a password-protected PDF, sent with its password or stored
+    decrypted under a document handle"""
+    if request.form.get('password') or request.form.get('current_password'):
+        return True
+    handle = request.form.get('document') or request.args.get('document')
+    document = document_store.get(handle) if handle else None
+    return document is not None and document.decrypted
+
+def cached_result(*params):
+    """Serve a route from the result cache, keyed on its uploads and the given form parameters"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if _decrypts_upload():
+                # Decrypted output is never cached, so it is not kept in memory or written to CACHE_DIR
+                return view(*args, **kwargs)
+            
+            uploads = [f for name in request.files for f in request.files.getlist(name)]
+            try:
+                key_params = {p: _normalize_param(p, request.form.get(p)) for p in params}
+                key_params['accept'] = request.headers.get('Accept', '').strip()
+                key_params['document'] = request.form.get('document') or request.args.get('document')
+                key = result_cache.key(request.endpoint, uploads, key_params)
+            except ValueError:
+                # Malformed parameters are reported by the view itself
+                return view(*args, **kwargs)
+            
+            entry = result_cache.get(key)
+            if entry is not None:
+                data, meta = entry
+                response = make_response(data)
+                response.content_type = meta['content_type']
+                response.headers.update(meta.get('headers', {}))
+                response.headers['X-Cache'] = 'HIT'
+                response.vary.add('Accept')
+                return response
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                meta = {
+                    'content_type': response.content_type,
+                    'headers': {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+                }
+                # Bodies already in memory are stored as they are. send_file passthroughs are only
+                # read into memory when their length is known to fit the memory tier; spooled temp
+                # files (unknown length) and generators go to the disk tier as they are sent
+                if not response.is_streamed:
+                    data = response.get_data()
+                    if len(data) <= result_cache.max_entry_bytes:
+                        result_cache.put(key, data, meta)
+                elif (response.direct_passthrough and response.content_length is not None
+                        and response.content_length <= result_cache.memory_bytes):
+                    response.direct_passthrough = False
+                    result_cache.put(key, response.get_data(), meta)
+                else:
+                    response.direct_passthrough = False
+                    response.response = result_cache.store_stream(key, response.response, meta)
+            response.headers['X-Cache'] = 'MISS'
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
+
+class PageSet:
+    """A page selection such as '1-100,200-,odd,even,last-5', kept as ranges instead of a page list
+    
+    Terms are comma separated: N, A-B, A- (to the end), -B (from the start), odd, even, last
+    (the final page) and last-K (the final K pages). Pages are 1-based; pages past the end of
+    the document are ignored. Selections keep the order the spec gives ('5,1-3' is 5, 1, 2, 3);
+    ranges() and pages(sorted_pages=True) normalise it where order has no meaning.
+    """
+    
+    TERM = re.compile(r'^(?:(?P<page>\d+)|(?P<start>\d+)?-(?P<stop>\d+)?|(?P<parity>odd|even)|last(?:-(?P<last>\d+))?)$')
+    
+    def __init__(self, spec):
+        self.spec = spec
+        self._terms = []  # ('range', start, stop or None) | ('step', first) | ('last', count)
+        for term in (spec or '').lower().replace(' ', '').split(','):
+            if not term:
+                continue
+            match = self.TERM.match(term)
+            if not match or term == '-':
+                raise ValueError(f"Invalid page range: {term}")
+            
+            if match.group('page'):
+                start = stop = int(match.group('page'))
+            elif match.group('parity'):
+                self._terms.append(('step', 1 if match.group('parity') == 'odd' else 2))
+                continue
+            elif term.startswith('last'):
+                self._terms.append(('last', int(match.group('last') or 1)))
+                continue
+            else:
+                start = int(match.group('start') or 1)
+                stop = int(match.group('stop')) if match.group('stop') else None
+            
+            if start < 1 or (stop is not None and stop < start):
+                raise ValueError(f"Invalid page range: {term}")
+            self._terms.append(('range', start, stop))
+        
+        if not self._terms:
+            raise ValueError("No pages selected")
+    
+    @classmethod
+    def of(cls, selection):
+        """Accept a spec string, a PageSet or an iterable of page numbers"""
+        if isinstance(selection, cls):
+            return selection
+        if isinstance(selection, str):
+            return cls(selection)
+        return cls(','.join(str(int(page)) for page in selection))
+    
+    def ranges(self, page_count):
+        """The selection for a document of page_count pages, as sorted, non-overlapping ranges
+        (plain runs merged, odd/even kept as strided ranges)"""
+        runs, steps = [], set()
+        for term in self._terms:
+            if term[0] == 'range':
+                runs.append((term[1], min(term[2] or page_count, page_count)))
+            elif term[0] == 'last':
+                runs.append((max(page_count - term[1] + 1, 1), page_count))
+            else:
+                steps.add(term[1])
+        if len(steps) == 2:
+            runs.append((1, page_count))
+            steps.clear()
+        
+        merged = []
+        for start, stop in sorted(run for run in runs if run[0] <= run[1]):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        return ([range(start, stop + 1) for start, stop in merged]
+                + [range(first, page_count + 1, 2) for first in steps])
+    
+    def pages(self, page_count, sorted_pages=False):
+        """Iterate the selected page numbers once each, without building the full list
+        
+        Pages come in the order the spec names them, or ascending with sorted_pages.
+        """
+        if sorted_pages:
+            previous = None
+            for page in heapq.merge(*self.ranges(page_count)):
+                if page != previous:
+                    yield page
+                    previous = page
+            return
+        
+        seen = set()
+        for term in self._terms:
+            if term[0] == 'range':
+                pages = range(term[1], min(term[2] or page_count, page_count) + 1)
+            elif term[0] == 'last':
+                pages = range(max(page_count - term[1] + 1, 1), page_count + 1)
+            else:
+                pages = range(term[1], page_count + 1, 2)
+            for page in pages:
+                if page not in seen:
+                    seen.add(page)
+                    yield page
+    
+    def __repr__(self):
+        return f'PageSet({self.spec!r})'
 
 class PDFProcessor:
     
     @staticmethod
-    def pdf_to_word(pdf_file):
+    @instrumented('pdf_to_word')
+    def pdf_to_word(pdf_file, progress=None):
         """Smart PDF to Word conversion with auto-detection"""
         try:
-            pdf_file.seek(0)
+            document = ParsedDocument.of(pdf_file)
             
-            # Check if PDF is scanned
-            is_scanned = PDFProcessor._check_if_scanned_pdf(pdf_file)
-            pdf_file.seek(0)
+            # Pick native extraction, pdf2docx layout or OCR for each page
+            with timed('detect'):
+                routes = PDFProcessor._route_pages(document)
             
-            if is_scanned:
-                return PDFProcessor._pdf_to_word_ocr(pdf_file)
-            else:
-                # Try regular extraction first
+            if routes and all(route == 'layout' for route in routes.values()):
+                # One pdf2docx pass over the whole document
                 try:
-                    result = PDFProcessor._pdf_to_word_regular(pdf_file)
-                    return result
-                except:
-                    # Fallback to OCR if regular fails
-                    pdf_file.seek(0)
-                    return PDFProcessor._pdf_to_word_ocr(pdf_file)
+                    return PDFProcessor._pdf_to_word_regular(document, progress)
+                except Exception:
+                    pass  # Go page by page so a single bad page does not sink the rest
+            
+            return PDFProcessor._pdf_to_word_hybrid(document, routes, progress)
                     
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"PDF to Word conversion failed: {str(e)}")
     
     @staticmethod
     def _check_if_scanned_pdf(pdf_file):
-        """Check if PDF is likely scanned"""
+        """Classify each page, returning {page_index: is_scanned}"""
+        document = ParsedDocument.of(pdf_file)
+        scanned = {}
         try:
-            import PyPDF2
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            
-            # Check first 3 pages
-            for i in range(min(3, len(pdf_reader.pages))):
-                page = pdf_reader.pages[i]
-                text += page.extract_text()
-            
-            word_count = len(text.split())
-            return word_count < 10  # If less than 10 words, likely scanned
-            
-        except:
-            return False  # Default to regular if can't analyze
+            with document.lock:
+                pdf_document = document.fitz_doc
+                for page_index in range(len(pdf_document)):
+                    try:
+                        scanned[page_index] = PDFProcessor._is_scanned_page(pdf_document, page_index)
+                    except Exception:
+                        scanned[page_index] = False  # Default to regular if can't analyze
+        except Exception:
+            pass
+        return scanned
+    
+    @staticmethod
+    def _route_pages(pdf_file):
+        """Choose a converter per page: 'ocr' for scans, 'layout' (pdf2docx) for pages with
+        images or drawings, 'native' for plain text"""
+        document = ParsedDocument.of(pdf_file)
+        scanned = PDFProcessor._check_if_scanned_pdf(document)
+        routes = {}
+        with document.lock:
+            pdf_document = document.fitz_doc
+            for page_index in range(len(pdf_document)):
+                if scanned.get(page_index):
+                    routes[page_index] = 'ocr'
+                    continue
+                try:
+                    page = pdf_document.load_page(page_index)
+                    has_layout = bool(page.get_images()) or len(page.get_cdrawings()) >= LAYOUT_MIN_DRAWINGS
+                except Exception:
+                    has_layout = True
+                routes[page_index] = 'layout' if has_layout else 'native'
+        return routes
     
     @staticmethod
-    def _pdf_to_word_regular(pdf_file):
-        """Regular PDF to Word using pdf2docx"""
+    def _is_scanned_page(pdf_document, page_index):
+        """Decide from the cheapest signal that settles it: text operators, image coverage, then a text probe"""
+        page = pdf_document.load_page(page_index)
+        
+        images = page.get_images()
+        if not images:
+            return False  # Text or vector drawings only; nothing to OCR
+        
+        # Text may sit directly in the page content or inside form XObjects
+        contents = b''.join(pdf_document.xref_stream(xref) or b'' for xref in page.get_contents())
+        may_have_text = bool(TEXT_OPERATOR.search(contents)) or bool(page.get_xobjects())
+        
+        page_area = abs(page.rect) or 1
+        covered = 0
+        for info in page.get_image_info():
+            covered += abs(fitz.Rect(info['bbox']) & page.rect)
+            if covered >= page_area * SCAN_IMAGE_COVERAGE:
+                break
+        else:
+            return False  # Images are decoration on a regular page
+        
+        if not may_have_text:
+            return True
+        # An image-covered page with text operators: a real text layer makes it native,
+        # a stray page number or stamp does not
+        return len(page.get_text("text", flags=0).strip()) < SCAN_MIN_CHARS
+    
+    @staticmethod
+    def _pdf_to_word_regular(pdf_file, progress=None):
+        """Regular PDF to Word using pdf2docx, entirely in memory"""
+        document = ParsedDocument.of(pdf_file)
         try:
-            from pdf2docx import parse
-            import tempfile
+            from pdf2docx import Converter
+        except ImportError:
+            # Fallback to PyMuPDF if pdf2docx not available
+            return PDFProcessor._pdf_to_word_fallback(document, progress)
+        
+        with contextlib.closing(Converter(stream=document.data)) as converter:
+            document.parses += 1
+            page_count = len(converter.fitz_doc)
+            count_pages(page_count)
             
-            # Save to temp file for pdf2docx
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-                pdf_file.seek(0)
-                temp_pdf.write(pdf_file.read())
-                temp_pdf_path = temp_pdf.name
+            settings = converter.default_settings
+            with timed('layout'):
+                PDFProcessor._parse_layout(converter, document, list(range(page_count)), settings)
             
-            # Convert using pdf2docx
             output = io.BytesIO()
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_docx:
-                parse(temp_pdf_path, temp_docx.name)
-                
-                with open(temp_docx.name, 'rb') as f:
-                    output.write(f.read())
-            
-            # Cleanup
-            import os
-            os.unlink(temp_pdf_path)
-            os.unlink(temp_docx.name)
-            
-            output.seek(0)
-            return output
-            
-        except ImportError:
-            # Fallback to PyMuPDF if pdf2docx not available
-            return PDFProcessor._pdf_to_word_fallback(pdf_file)
+            with timed('write'):
+                converter.make_docx(output, **settings)
+        
+        if progress:
+            # pdf2docx converts the whole document in one call
+            progress(page_count, page_count)
+        
+        output.seek(0)
+        return output
     
     @staticmethod
-    def _pdf_to_word_ocr(pdf_file):
-        """OCR-based PDF to Word conversion"""
-        try:
-            import pdf2image
-            import pytesseract
-            from docx.shared import Inches, Pt
-            
-            pdf_bytes = pdf_file.read()
-            images = pdf2image.convert_from_bytes(pdf_bytes, dpi=300)
-            
-            doc = Document()
-            
-            # Set margins
-            for section in doc.sections:
-                section.top_margin = Inches(0.5)
-                section.bottom_margin = Inches(0.5)
-                section.left_margin = Inches(0.5)
-                section.right_margin = Inches(0.5)
-            
-            total_words = 0
+    def _parse_layout(converter, document, page_indexes, settings):
+        """Parse pages with pdf2docx, spreading large documents over a pool of worker processes
+        
+        pdf2docx's own multi_processing option needs a file path and writes its results next to
+        the working directory, so the pool here exchanges the parsed layouts in memory instead.
+        """
+        workers = min(LAYOUT_WORKERS, len(page_indexes) // max(LAYOUT_PAGES_PER_WORKER, 1))
+        if workers <= 1:
+            converter.parse(pages=page_indexes, **settings)
+            return
+        
+        # Contiguous runs, one per worker, as pdf2docx splits them
+        size = -(-len(page_indexes) // workers)
+        runs = [page_indexes[i:i + size] for i in range(0, len(page_indexes), size)]
+        converter.load_pages(pages=page_indexes)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_layout_worker_init,
+                                 initargs=(document.data,)) as executor:
+            for stored_pages in executor.map(_layout_worker_pages, runs, [settings] * len(runs)):
+                for stored in stored_pages:
+                    converter.pages[stored['id']].restore(stored)
+    
+    @staticmethod
+    def _pdf_to_word_hybrid(pdf_file, routes, progress=None):
+        """Build one DOCX page by page, converting each page along its route
+        
+        A page whose route fails is rolled back and retried on its own with native extraction.
+        """
+        document = ParsedDocument.of(pdf_file)
+        page_count = len(routes)
+        count_pages(page_count)
+        doc = Document()
+        
+        with contextlib.ExitStack() as stack:
+            layout_pages = PDFProcessor._layout_pages(
+                document, [i for i in range(page_count) if routes[i] == 'layout'], stack)
+            ocr_results = PDFProcessor._ocr_pages(
+                document, [i for i in range(page_count) if routes[i] == 'ocr'], stack)
             
-            for i, image in enumerate(images):
-                if i > 0:
-                    doc.add_page_break()
+            for i in range(page_count):
+                written = False
+                if i in layout_pages:
+                    with timed('layout'):
+                        written = PDFProcessor._write_page(doc, layout_pages[i].make_docx)
+                elif i in ocr_results:
+                    with timed('ocr'):
+                        text, error = ocr_results[i].result()
+                    written = PDFProcessor._write_page(
+                        doc, lambda doc: PDFProcessor._add_ocr_page(doc, document, i, text, error))
                 
-                try:
-                    # Perform OCR
-                    text = pytesseract.image_to_string(image, lang='eng')
-                    
-                    if text.strip():
-                        # Split into paragraphs
-                        paragraphs = text.split('\n\n')
-                        
-                        for para_text in paragraphs:
-                            para_text = para_text.strip()
-                            if para_text:
-                                paragraph = doc.add_paragraph(para_text)
-                                paragraph.paragraph_format.space_after = Pt(6)
-                                total_words += len(para_text.split())
-                    else:
-                        doc.add_paragraph(f"[No text detected on page {i+1}]")
-                        
-                except Exception as e:
-                    doc.add_paragraph(f"[OCR Error on page {i+1}: {str(e)}]")
-            
-            output = io.BytesIO()
+                if not written:
+                    with timed('extract'), document.lock:
+                        page = document.fitz_doc.load_page(i)
+                        PDFProcessor._new_page_section(doc, page)
+                        PDFProcessor._add_native_page(doc, page, i)
+                
+                if progress:
+                    progress(i + 1, page_count)
+        
+        output = io.BytesIO()
+        with timed('write'):
             doc.save(output)
-            output.seek(0)
-            return output
+        output.seek(0)
+        return output
+    
+    @staticmethod
+    def _layout_pages(document, page_indexes, stack):
+        """Parse pages with pdf2docx, returning {page_index: parsed page} for the pages that parsed"""
+        if not page_indexes:
+            return {}
+        try:
+            from pdf2docx import Converter
             
+            converter = Converter(stream=document.data)
+            stack.callback(converter.close)
+            document.parses += 1
+            settings = converter.default_settings
+            # Pages that fail to parse are skipped and picked up by the native retry
+            settings.update(ignore_page_error=True, raw_exceptions=False)
+            with timed('layout'):
+                PDFProcessor._parse_layout(converter, document, page_indexes, settings)
+            return {page.id: page for page in converter.pages if page.finalized}
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def _ocr_pages(document, page_indexes, stack):
+        """Start OCR of the given pages in a worker pool, returning {page_index: future}"""
+        if not page_indexes:
+            return {}
+        try:
+            import pytesseract
         except ImportError:
-            # Fallback if OCR libraries not available
-            return PDFProcessor._pdf_to_word_fallback(pdf_file)
+            return {}  # No OCR available; these pages are extracted natively
+        
+        # Each worker rasterizes one page at a time, so at most `workers` pages are held in memory
+        workers = max(1, min(OCR_WORKERS, len(page_indexes)))
+        executor = stack.enter_context(ProcessPoolExecutor(
+            max_workers=workers, initializer=_ocr_worker_init, initargs=(document.data,)))
+        # Cancel outstanding pages if the conversion fails part way
+        stack.callback(executor.shutdown, cancel_futures=True)
+        return {i: executor.submit(_ocr_worker_page, i) for i in page_indexes}
     
     @staticmethod
-    def _pdf_to_word_fallback(pdf_file):
+    def _write_page(doc, write):
+        """Run write(doc), removing whatever it appended if it fails; returns whether it succeeded"""
+        body = doc.element.body
+        existing = len(body)
+        try:
+            write(doc)
+            return True
+        except Exception:
+            # The body's final sectPr stays; everything added before it goes
+            for element in list(body)[existing - 1:-1]:
+                body.remove(element)
+            return False
+    
+    @staticmethod
+    def _new_page_section(doc, page):
+        """Start a new single-column section sized like the PDF page"""
+        section = doc.add_section(WD_SECTION.NEW_PAGE) if doc.paragraphs else doc.sections[0]
+        section.page_width = Pt(page.rect.width)
+        section.page_height = Pt(page.rect.height)
+        section.top_margin = Inches(0.5)
+        section.bottom_margin = Inches(0.5)
+        section.left_margin = Inches(0.5)
+        section.right_margin = Inches(0.5)
+        # pdf2docx pages may have left a multi-column layout behind; reset it to one column
+        # (pdf2docx itself expects the w:cols element to be there)
+        columns = section._sectPr.find(qn('w:cols'))
+        if columns is None:
+            columns = OxmlElement('w:cols')
+            section._sectPr.append(columns)
+        for child in list(columns):
+            columns.remove(child)
+        columns.attrib.clear()
+        columns.set(qn('w:space'), '720')
+    
+    @staticmethod
+    def _add_ocr_page(doc, document, page_index, text, error):
+        """Append a page's OCR text, one paragraph per block"""
+        with document.lock:
+            PDFProcessor._new_page_section(doc, document.fitz_doc.load_page(page_index))
+        
+        if error is not None:
+            doc.add_paragraph(f"[OCR Error on page {page_index + 1}: {error}]")
+        elif text.strip():
+            # Split into paragraphs
+            for para_text in text.split('\n\n'):
+                para_text = para_text.strip()
+                if para_text:
+                    paragraph = doc.add_paragraph(para_text)
+                    paragraph.paragraph_format.space_after = Pt(6)
+        else:
+            doc.add_paragraph(f"[No text detected on page {page_index + 1}]")
+    
+    @staticmethod
+    def _pdf_to_word_fallback(pdf_file, progress=None):
         """Enhanced fallback PDF to Word conversion using PyMuPDF"""
         try:
-            pdf_bytes = pdf_file.read()
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            pdf_document = ParsedDocument.of(pdf_file).fitz_doc
             doc = Document()
             
             # Set margins
@@ -165,400 +1480,1224 @@ class PDFProcessor:
                 section.left_margin = Inches(0.5)
                 section.right_margin = Inches(0.5)
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                if page_num > 0:
-                    doc.add_page_break()
+            count_pages(len(pdf_document))
+            with timed('extract'):
+                for page_num in range(len(pdf_document)):
+                    page = pdf_document.load_page(page_num)
+                    if page_num > 0:
+                        doc.add_page_break()
                 
-                # Extract text with formatting
-                try:
-                    blocks = page.get_text("dict")["blocks"]
-                    
-                    for block in blocks:
-                        if "lines" not in block:
-                            continue
-                        
-                        for line in block["lines"]:
-                            if not line.get("spans"):
-                                continue
-                            
-                            paragraph = doc.add_paragraph()
-                            
-                            for span in line["spans"]:
-                                text = span.get("text", "")
-                                if text.strip():
-                                    run = paragraph.add_run(text)
-                                    
-                                    # Apply basic formatting
-                                    font_size = span.get("size", 12)
-                                    font_flags = span.get("flags", 0)
-                                    
-                                    run.font.size = Pt(font_size)
-                                    run.font.bold = bool(font_flags & 16)
-                                    run.font.italic = bool(font_flags & 2)
-                except:
-                    # Simple text extraction if structured fails
-                    text = page.get_text()
-                    if text.strip():
-                        lines = text.split('\n')
-                        for line in lines:
-                            line = line.strip()
-                            if line:
-                                doc.add_paragraph(line)
-                    else:
-                        doc.add_paragraph(f"[Page {page_num + 1} - No text found]")
+                    PDFProcessor._add_native_page(doc, page, page_num)
+                
+                    if progress:
+                        progress(page_num + 1, len(pdf_document))
             
-            pdf_document.close()
             output = io.BytesIO()
-            doc.save(output)
+            with timed('write'):
+                doc.save(output)
             output.seek(0)
             return output
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             # Last resort - create document with error message
             doc = Document()
             doc.add_paragraph(f"Error extracting text from PDF: {str(e)}")
             doc.add_paragraph("Please try uploading a different PDF file.")
             output = io.BytesIO()
-            doc.save(output)
+            with timed('write'):
+                doc.save(output)
             output.seek(0)
             return output
 
     @staticmethod
-    def pdf_to_excel(pdf_file):
-        """Convert PDF to Excel"""
+    def _add_native_page(doc, page, page_num):
+        """Append a page's text to doc, keeping span size, bold and italic
+        
+        Spans are merged into runs and lines into paragraphs before any XML is built, and the
+        page's paragraphs are then parsed in one go instead of through add_paragraph/add_run.
+        """
+        # Extract text with formatting
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            data = []
-            for page_num, page in enumerate(pdf_reader.pages):
-                text = page.extract_text()
+            blocks = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]
+            paragraphs = []
+            for block in blocks:
+                paragraphs.extend(PDFProcessor._block_paragraphs(block))
+            
+            if paragraphs:
+                xml = ''.join(
+                    '<w:p>' + ''.join(
+                        f'<w:r>{PDFProcessor._run_properties(style)}'
+                        f'<w:t xml:space="preserve">{xml_escape(XML_ILLEGAL_CHARS.sub("", text))}</w:t></w:r>'
+                        for style, text in runs
+                    ) + '</w:p>'
+                    for runs in paragraphs
+                )
+                fragment = parse_xml(f'<w:body xmlns:w="{WORD_NAMESPACE}">{xml}</w:body>')
+                
+                body = doc.element.body
+                section_properties = body.sectPr
+                for paragraph in list(fragment):
+                    if section_properties is not None:
+                        section_properties.addprevious(paragraph)
+                    else:
+                        body.append(paragraph)
+        except:
+            # Simple text extraction if structured fails
+            text = page.get_text()
+            if text.strip():
                 lines = text.split('\n')
-                for line_num, line in enumerate(lines):
-                    if line.strip():
-                        data.append({
-                            'Page': page_num + 1,
-                            'Line': line_num + 1,
-                            'Content': line.strip()
-                        })
-            
-            df = pd.DataFrame(data)
+                for line in lines:
+                    line = XML_ILLEGAL_CHARS.sub('', line).strip()
+                    if line:
+                        doc.add_paragraph(line)
+            else:
+                doc.add_paragraph(f"[Page {page_num + 1} - No text found]")
+    
+    @staticmethod
+    def _block_paragraphs(block):
+        """Turn a PyMuPDF text block into paragraphs of [(size, bold, italic), text] runs
+        
+        Lines of a block flow into one paragraph until a vertical gap of more than half a line, a
+        line that starts with a bullet or list number, or a line that ends short of the block's
+        right edge by more than the next line's first word (list items, addresses, headings);
+        adjacent spans with the same style share a run.
+        """
+        paragraphs, runs, previous = [], [], None
+        right_edge = block["bbox"][2]
+        for line in block.get("lines", ()):
+            spans = [span for span in line.get("spans", ()) if span.get("text")]
+            if not spans:
+                continue
+            
+            top, bottom, right = line["bbox"][1], line["bbox"][3], line["bbox"][2]
+            if previous is not None and top < (previous[0] + previous[1]) / 2:
+                # Another piece of the same row (PyMuPDF splits rows at wide gaps)
+                if runs and not runs[-1][1][-1:].isspace():
+                    runs[-1][1] += ' '
+                previous = (previous[0], max(previous[1], bottom), max(previous[2], right))
+            else:
+                if previous is not None:
+                    text = ''.join(span["text"] for span in spans)
+                    shortfall = right_edge - previous[2]
+                    new_paragraph = (top - previous[1] > (previous[1] - previous[0]) / 2
+                                     or LIST_MARKER.match(text)
+                                     # Cheap bound first: no word and space fit in a quarter em
+                                     or (shortfall > spans[0].get("size", 12) / 4
+                                         and shortfall > PDFProcessor._first_word_width(spans)))
+                    if new_paragraph:
+                        if runs:
+                            paragraphs.append(runs)
+                        runs = []
+                    elif runs and not runs[-1][1][-1:].isspace():
+                        # Wrapped line: continue the paragraph after a space
+                        runs[-1][1] += ' '
+                previous = (top, bottom, right)
+            
+            for span in spans:
+                text = span["text"]
+                if runs and text.isspace():
+                    runs[-1][1] += text
+                    continue
+                
+                flags = span.get("flags", 0)
+                style = (round(span.get("size", 12) * 2), bool(flags & 16), bool(flags & 2))
+                if runs and runs[-1][0] == style:
+                    runs[-1][1] += text
+                else:
+                    runs.append([style, text])
+        
+        if runs:
+            paragraphs.append(runs)
+        # Drop paragraphs that hold nothing but whitespace
+        return [runs for runs in paragraphs if any(text.strip() for _, text in runs)]
+    
+    @staticmethod
+    def _first_word_width(spans):
+        """Width of a line's first word plus a space, in the base-14 font closest to its span's
+        (sans, serif or mono, bold, italic)
+        
+        Base-14 fonts only cover Latin-1; other characters count as one em when East Asian wide
+        and half an em otherwise.
+        """
+        span = next((span for span in spans if span["text"].strip()), None)
+        if span is None:
+            return 0
+        flags = span.get("flags", 0)
+        kind = 'mono' if flags & 8 else 'serif' if flags & 4 else 'sans'
+        fontname = BASE14_FONTS[kind][bool(flags & 16) + 2 * bool(flags & 2)]
+        size = span.get("size", 12)
+        word = span["text"].split(None, 1)[0]
+        latin = ''.join(ch for ch in word if ord(ch) < 256)
+        width = fitz.get_text_length(latin + ' ', fontname=fontname, fontsize=size)
+        for ch in word:
+            if ord(ch) >= 256:
+                width += size if unicodedata.east_asian_width(ch) in 'WF' else size / 2
+        return width
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _run_properties(style):
+        """<w:rPr> for a (half-point size, bold, italic) style, built once per style"""
+        size, bold, italic = style
+        return ('<w:rPr>' + ('<w:b/>' if bold else '') + ('<w:i/>' if italic else '')
+                + f'<w:sz w:val="{size}"/><w:szCs w:val="{size}"/></w:rPr>')
+    
+    @staticmethod
+    @instrumented('pdf_to_excel')
+    def pdf_to_excel(pdf_file, progress=None):
+        """Convert PDF to Excel, one sheet per detected table plus a sheet for the remaining text"""
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+            
+            document = ParsedDocument.of(pdf_file)
+            # Rows are streamed to per-sheet temp files, so memory stays flat on long statements
+            workbook = Workbook(write_only=True)
+            bold = Font(bold=True)
+            
+            def header_row(sheet, values):
+                cells = []
+                for value in values:
+                    cell = WriteOnlyCell(sheet, value=value)
+                    cell.font = bold
+                    cells.append(cell)
+                sheet.append(cells)
+            text_sheet = None
+            previous = None  # (sheet, column count, header) of the last table seen
+            table_count = 0
+            
+            with document.lock:
+                pdf_document = document.fitz_doc
+                count_pages(len(pdf_document))
+                
+                for page_num in range(len(pdf_document)):
+                    with timed('extract'):
+                        words = pdf_document.load_page(page_num).get_text("words")
+                    with timed('tables'):
+                        rows = PDFProcessor._word_rows(words)
+                        tables, text_rows = PDFProcessor._find_tables(rows)
+                    
+                    for i, table in enumerate(tables):
+                        header = table[0]
+                        # A table that starts a page with the same shape as the one that ended
+                        # the previous page is its continuation
+                        if i == 0 and previous is not None and previous[1] == len(header):
+                            sheet = previous[0]
+                            if header == previous[2]:
+                                table = table[1:]
+                        else:
+                            table_count += 1
+                            sheet = workbook.create_sheet(f'Table {table_count}')
+                            header_row(sheet, header)
+                            table = table[1:]
+                        
+                        for row in table:
+                            sheet.append([PDFProcessor._typed_cell(value) for value in row])
+                        previous = (sheet, len(header), header)
+                    
+                    if text_rows:
+                        if text_sheet is None:
+                            text_sheet = workbook.create_sheet('Text')
+                            header_row(text_sheet, ('Page', 'Line', 'Content'))
+                        for line_num, line in text_rows:
+                            text_sheet.append([page_num + 1, line_num, line])
+                    
+                    if progress:
+                        progress(page_num + 1, len(pdf_document))
+            
+            if text_sheet is None and table_count == 0:
+                workbook.create_sheet('Text').append(['Page', 'Line', 'Content'])
+            
             output = io.BytesIO()
-            df.to_excel(output, index=False)
+            with timed('write'):
+                workbook.save(output)
             output.seek(0)
             return output
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"Error converting PDF to Excel: {str(e)}")
     
     @staticmethod
-    def scan_pdf_pages(pdf_file):
-        """Scan PDF and return page previews"""
+    def _word_rows(words):
+        """Group PyMuPDF words into rows of cells, returning [(top, bottom, [(x0, x1, text), ...]), ...]"""
+        if not words:
+            return []
+        boxes = np.array([word[:4] for word in words], dtype=float)
+        line_height = float(np.median(boxes[:, 3] - boxes[:, 1])) or 1.0
+        
+        # Words whose vertical centres are within half a line of each other share a row
+        centres = (boxes[:, 1] + boxes[:, 3]) / 2
+        by_centre = np.argsort(centres, kind='stable')
+        row_ids = np.empty(len(words), dtype=int)
+        row_ids[by_centre] = np.cumsum(np.r_[0, np.diff(centres[by_centre]) > line_height / 2])
+        
+        # Within a row, a horizontal gap wider than ~half a line starts a new cell
+        order = np.lexsort((boxes[:, 0], row_ids))
+        row_ids, boxes = row_ids[order], boxes[order]
+        new_row = np.r_[True, row_ids[1:] != row_ids[:-1]]
+        new_cell = new_row | np.r_[True, boxes[1:, 0] - boxes[:-1, 2] > line_height * 0.6]
+        
+        rows = []
+        starts = np.flatnonzero(new_cell)
+        for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+            cell = (float(boxes[start:end, 0].min()), float(boxes[start:end, 2].max()),
+                    ' '.join(words[k][4] for k in order[start:end]))
+            top, bottom = float(boxes[start:end, 1].min()), float(boxes[start:end, 3].max())
+            if new_row[start]:
+                rows.append((top, bottom, [cell]))
+            else:
+                rows[-1] = (min(rows[-1][0], top), max(rows[-1][1], bottom), rows[-1][2] + [cell])
+        return rows
+    
+    @staticmethod
+    def _find_tables(rows):
+        """Split a page's rows into tables (lists of equal-width rows of strings) and leftover text lines"""
+        # Consecutive multi-cell rows form a region; a single-cell row between two of them
+        # is wrapped cell text and stays in the region
+        regions, current = [], []
+        for i, (_, _, cells) in enumerate(rows):
+            is_table_row = len(cells) >= TABLE_MIN_COLUMNS
+            continues = (current and i + 1 < len(rows) and len(rows[i + 1][2]) >= TABLE_MIN_COLUMNS)
+            if is_table_row or continues:
+                current.append(rows[i])
+                continue
+            if current:
+                regions.append(current)
+                current = []
+            regions.append([rows[i]])
+        if current:
+            regions.append(current)
+        
+        tables, text_rows = [], []
+        line_num = 0
+        for region in regions:
+            table = None
+            if sum(len(cells) >= TABLE_MIN_COLUMNS for _, _, cells in region) >= TABLE_MIN_ROWS:
+                table = PDFProcessor._table_grid(region)
+            if table is not None:
+                tables.append(table)
+                line_num += len(region)
+                continue
+            for _, _, cells in region:
+                line_num += 1
+                text_rows.append((line_num, ' '.join(cell[2] for cell in cells)))
+        return tables, text_rows
+    
+    @staticmethod
+    def _table_grid(region):
+        """Cluster a region's cells into columns; None if it does not hold at least two columns"""
+        cells = np.array([(x0, x1) for _, _, row in region for x0, x1, _ in row])
+        left = int(np.floor(cells[:, 0].min()))
+        width = int(np.ceil(cells[:, 1].max())) - left + 2
+        
+        # Coverage profile along x: how many cells span each point
+        delta = np.zeros(width, dtype=int)
+        np.add.at(delta, np.floor(cells[:, 0]).astype(int) - left, 1)
+        np.add.at(delta, np.ceil(cells[:, 1]).astype(int) - left, -1)
+        covered = np.cumsum(delta) > int(len(region) * TABLE_GAP_COVERAGE)
+        
+        # Each covered run is a column; boundaries sit in the middle of the gaps between runs
+        change = np.diff(np.r_[0, covered.astype(int), 0])
+        run_starts, run_ends = np.flatnonzero(change == 1), np.flatnonzero(change == -1)
+        if len(run_starts) < TABLE_MIN_COLUMNS:
+            return None
+        boundaries = (run_ends[:-1] + run_starts[1:]) / 2 + left
+        
+        grid = []
+        for _, _, row in region:
+            values = [''] * (len(boundaries) + 1)
+            for x0, x1, text in row:
+                column = int(np.searchsorted(boundaries, (x0 + x1) / 2))
+                values[column] = f'{values[column]} {text}'.strip()
+            grid.append(values)
+        return grid
+    
+    @staticmethod
+    def _typed_cell(value):
+        """Numbers (with thousands separators, currency signs, accounting negatives) as floats, else text"""
+        text = value.strip()
+        if not text:
+            return None
+        match = NUMBER_PATTERN.match(text)
+        if not match:
+            return text
+        digits = match.group('digits').replace(',', '')
+        # Keep identifiers such as account numbers with leading zeros as text
+        if len(digits) > 1 and digits[0] == '0' and not digits.startswith('0.'):
+            return text
+        number = float(digits)
+        if match.group('open') or match.group('sign') == '-' or match.group('trailing'):
+            number = -number
+        return int(number) if '.' not in digits and abs(number) < 2 ** 53 else number
+    
+    @staticmethod
+    @instrumented('pdf_to_images')
+    def pdf_to_images(pdf_file, image_format='png', quality=2, progress=None):
+        """Convert PDF pages to images, returning a generator of ZIP archive chunks"""
+        try:
+            document = ParsedDocument.of(pdf_file)
+            pdf_document = document.fitz_doc
+        except InvalidPasswordError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error converting PDF to images: {str(e)}")
+        
+        ext = 'jpg' if image_format.lower() == 'jpg' else 'png'
+        document.pin()
+        
+        def render_pages():
+            # Pages are rendered in parallel and streamed out in order as they complete
+            document.lock.acquire()
+            try:
+                page_count = len(pdf_document)
+                for page_num, img_data in render_pages_parallel(document, range(1, page_count + 1),
+                                                                 quality, ext):
+                    yield f'page_{page_num}.{ext}', img_data
+                    if progress:
+                        progress(page_num, page_count)
+            finally:
+                document.lock.release()
+                document.release()
+        
+        return stream_zip(render_pages())
+    
+    @staticmethod
+    @instrumented('render_thumbnails')
+    def render_thumbnails(pdf_file, first_page, last_page, scale=0.5):
+        """Return previews for a page range, rendering only pages missing from the thumbnail cache"""
         try:
             import base64
-            pdf_document = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            document = ParsedDocument.of(pdf_file)
             pages = []
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                pix = page.get_pixmap(matrix=fitz.Matrix(0.5, 0.5), alpha=False)
-                img_data = pix.tobytes("png")
-                img_base64 = base64.b64encode(img_data).decode('utf-8')
+            with document.lock:
+                pdf_document = document.fitz_doc
+                last_page = min(last_page, len(pdf_document))
                 
-                pages.append({
-                    'page_num': page_num + 1,
-                    'preview': f'data:image/png;base64,{img_base64}'
-                })
-                pix = None
+                for page_num in range(max(first_page, 1), last_page + 1):
+                    key = f'{document.digest}:{page_num}:{scale}'
+                    entry = thumbnail_cache.get(key)
+                    if entry is not None:
+                        img_data = entry[0]
+                    else:
+                        with timed('render'):
+                            page = pdf_document.load_page(page_num - 1)
+                            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+                            img_data = pix.tobytes("png")
+                        pix = None
+                        count_pages(1)
+                        thumbnail_cache.put(key, img_data, None)
+                    
+                    with timed('encode'):
+                        img_base64 = base64.b64encode(img_data).decode('utf-8')
+                    pages.append({
+                        'page_num': page_num,
+                        'preview': f'data:image/png;base64,{img_base64}'
+                    })
             
-            pdf_document.close()
             return pages
+        except InvalidPasswordError:
+            raise
         except Exception as e:
-            raise Exception(f"Error scanning PDF: {str(e)}")
+            raise Exception(f"Error rendering thumbnails: {str(e)}")
     
     @staticmethod
-    def convert_selected_pages(pdf_file, selected_pages, image_format='png', quality=2):
-        """Convert selected PDF pages to images"""
+    @instrumented('iter_selected_pages')
+    def iter_selected_pages(pdf_file, selected_pages, image_format='png', quality=2):
+        """Render selected PDF pages to images, returning a generator of (page_num, filename, data)"""
         try:
-            import base64
-            pdf_document = fitz.open(stream=pdf_file.read(), filetype="pdf")
-            images = []
-            
-            dpi = 150 if quality == 1 else 200 if quality == 2 else 300
-            zoom = dpi / 72.0
-            zoom_matrix = fitz.Matrix(zoom, zoom)
+            document = ParsedDocument.of(pdf_file)
+            pdf_document = document.fitz_doc
+        except InvalidPasswordError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error converting selected pages: {str(e)}")
+        
+        dpi = 150 if quality == 1 else 200 if quality == 2 else 300
+        zoom = dpi / 72.0
+        ext = 'jpg' if image_format.lower() == 'jpg' else 'png'
+        selected_pages = PageSet.of(selected_pages)
+        document.pin()
+        
+        def render_pages():
+            document.lock.acquire()
+            try:
+                page_numbers = selected_pages.pages(len(pdf_document))
+                for page_num, img_data in render_pages_parallel(document, page_numbers, zoom, ext,
+                                                                 jpg_quality=95):
+                    yield page_num, f'page_{page_num:03d}.{image_format.lower()}', img_data
+            finally:
+                document.lock.release()
+                document.release()
+        
+        return render_pages()
+    
+    @staticmethod
+    @instrumented('images_to_pdf')
+    def images_to_pdf(image_files, page_size='letter', fit_mode='fit', dpi=None):
+        """Convert images to PDF, one image per page
+        
+        JPEG and JPEG 2000 files are embedded as they are; anything else is decoded and encoded
+        as JPEG in a thread pool. With dpi set, images holding more pixels than the page can show
+        at that resolution are downscaled first.
+        """
+        from collections import deque
+        import shutil
+        
+        page_sizes = {'letter': letter, 'a4': A4, 'legal': legal}
+        width, height = page_sizes.get(page_size, letter)
+        work_dir = None
+        output = fitz.open()
+        try:
+            work_path = None
+            embedded_since_checkpoint = 0
+            image_files = iter(image_files)
             
-            for page_num in selected_pages:
-                if page_num <= len(pdf_document):
-                    page = pdf_document.load_page(page_num - 1)
-                    pix = page.get_pixmap(matrix=zoom_matrix, alpha=False)
+            with ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='pdfgears-image') as executor:
+                # Keep a bounded number of images decoded at once
+                pending = deque()
+                while True:
+                    while len(pending) < IMAGE_WORKERS * 2:
+                        image_file = next(image_files, None)
+                        if image_file is None:
+                            break
+                        pending.append(executor.submit(PDFProcessor._prepare_image, image_file,
+                                                       width, height, fit_mode, dpi))
+                    if not pending:
+                        break
                     
-                    if image_format.lower() == 'jpg':
-                        img_data = pix.tobytes("jpeg", jpg_quality=95)
-                    else:
-                        img_data = pix.tobytes("png")
+                    with timed('encode'):
+                        rect, data = pending.popleft().result()
+                    page = output.new_page(width=width, height=height)
+                    page.insert_image(rect, stream=data, keep_proportion=False)
+                    count_pages(1)
+                    embedded_since_checkpoint += len(data)
+                    del data
                     
-                    img_base64 = base64.b64encode(img_data).decode('utf-8')
-                    images.append({
-                        'page_num': page_num,
-                        'filename': f'page_{page_num:03d}.{image_format.lower()}',
-                        'data': img_base64
-                    })
-                    pix = None
+                    # Flush the embedded images to disk and reopen so they are not held in memory
+                    if embedded_since_checkpoint >= IMAGE_CHECKPOINT_BYTES:
+                        with timed('write'):
+                            if work_path:
+                                output.saveIncr()
+                            else:
+                                work_dir = tempfile.mkdtemp(prefix='pdfgears-images-')
+                                work_path = os.path.join(work_dir, 'images.pdf')
+                                output.save(work_path)
+                        output.close()
+                        output = fitz.open(work_path)
+                        embedded_since_checkpoint = 0
             
-            pdf_document.close()
-            return images
+            if not len(output):
+                raise ValueError("No images provided")
+            
+            with timed('write'):
+                if not work_path:
+                    return io.BytesIO(output.tobytes())
+                output_path = os.path.join(work_dir, 'output.pdf')
+                output.save(output_path, garbage=1)
+            result = tempfile.SpooledTemporaryFile(max_size=MERGE_SPOOL_BYTES)
+            with open(output_path, 'rb') as f:
+                shutil.copyfileobj(f, result, 1024 * 1024)
+            result.seek(0)
+            return result
         except Exception as e:
-            raise Exception(f"Error converting selected pages: {str(e)}")
+            raise Exception(f"Error converting images to PDF: {str(e)}")
+        finally:
+            output.close()
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
     
     @staticmethod
-    def images_to_pdf(image_files, page_size='letter', fit_mode='fit'):
-        """Convert images to PDF"""
+    def _prepare_image(image_file, width, height, fit_mode, dpi=None):
+        """Place one image on a width x height page, returning (fitz.Rect, image bytes to embed)"""
+        image_file.seek(0)
+        data = image_file.read()
+        img = Image.open(io.BytesIO(data))
+        img_width, img_height = img.size
+        
+        if fit_mode == 'stretch':
+            new_width, new_height = width * 0.9, height * 0.9
+            x, y = width * 0.05, height * 0.05
+        elif fit_mode == 'fill':
+            scale = max(width/img_width, height/img_height) * 0.9
+            new_width, new_height = img_width * scale, img_height * scale
+            x = (width - new_width) / 2
+            y = (height - new_height) / 2
+        else:
+            scale = min(width/img_width, height/img_height) * 0.8
+            new_width, new_height = img_width * scale, img_height * scale
+            x = (width - new_width) / 2
+            y = (height - new_height) / 2
+        rect = fitz.Rect(x, y, x + new_width, y + new_height)
+        
+        # Pixels the placed image can show at the target resolution
+        target_size = None
+        if dpi:
+            target_size = (max(1, round(new_width / 72 * dpi)), max(1, round(new_height / 72 * dpi)))
+            if img_width <= target_size[0] and img_height <= target_size[1]:
+                target_size = None
+        
+        if img.format in IMAGE_PASSTHROUGH_FORMATS and img.mode in ('RGB', 'L') and not target_size:
+            return rect, data
+        
+        if target_size:
+            # Let the JPEG decoder skip detail we are about to throw away
+            img.draft('RGB', target_size)
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        if target_size:
+            img = img.resize(target_size, Image.LANCZOS, reducing_gap=3.0)
+        
+        encoded = io.BytesIO()
+        img.save(encoded, format='JPEG', quality=IMAGE_JPEG_QUALITY)
+        return rect, encoded.getvalue()
+
+    @staticmethod
+    @instrumented('merge_pdfs')
+    def merge_pdfs(pdf_files, password=None, progress=None):
+        """Merge multiple PDF files through temp files, returning a spooled file with the result
+        
+        Inputs that need a password are opened with password. progress(done, total) is called
+        after each input.
+        """
+        import shutil
+        work_dir = tempfile.mkdtemp(prefix='pdfgears-merge-')
+        merged = None
         try:
-            page_sizes = {'letter': letter, 'a4': A4, 'legal': legal}
-            page_size_tuple = page_sizes.get(page_size, letter)
-            width, height = page_size_tuple
+            # Spool the inputs to disk so only one of them is open at a time
+            input_paths = []
+            for i, pdf_file in enumerate(pdf_files):
+                path = os.path.join(work_dir, f'input-{i}.pdf')
+                PDFProcessor._spool_to_file(pdf_file, path)
+                input_paths.append(path)
             
-            output = io.BytesIO()
-            c = canvas.Canvas(output, pagesize=page_size_tuple)
+            work_path = os.path.join(work_dir, 'merged.pdf')
+            merged = fitz.open()
+            saved = False
+            pages_since_checkpoint = 0
             
-            for image_file in image_files:
-                image_file.seek(0)
-                img = Image.open(image_file)
-                img_width, img_height = img.size
+            for number, path in enumerate(input_paths, 1):
+                with fitz.open(path) as source:
+                    if source.needs_pass and not source.authenticate(password or ''):
+                        raise InvalidPasswordError(f"Invalid password for file {number}")
+                    count_pages(len(source))
+                    with timed('merge'):
+                        merged.insert_pdf(source)
+                    pages_since_checkpoint += len(source)
+                if progress:
+                    progress(number, len(input_paths))
                 
-                if fit_mode == 'stretch':
-                    new_width, new_height = width * 0.9, height * 0.9
-                    x, y = width * 0.05, height * 0.05
-                elif fit_mode == 'fill':
-                    scale = max(width/img_width, height/img_height) * 0.9
-                    new_width, new_height = img_width * scale, img_height * scale
-                    x = (width - new_width) / 2
-                    y = (height - new_height) / 2
-                else:
-                    scale = min(width/img_width, height/img_height) * 0.8
-                    new_width, new_height = img_width * scale, img_height * scale
-                    x = (width - new_width) / 2
-                    y = (height - new_height) / 2
-                
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                temp_img = io.BytesIO()
-                img.save(temp_img, format='JPEG', quality=85)
-                temp_img.seek(0)
-                
-                c.drawImage(temp_img, x, y, new_width, new_height)
-                c.showPage()
+                # Flush what we have so far and reopen, dropping the objects held in memory
+                if pages_since_checkpoint >= MERGE_CHECKPOINT_PAGES:
+                    with timed('write'):
+                        if saved:
+                            merged.saveIncr()
+                        else:
+                            merged.save(work_path)
+                            saved = True
+                    merged.close()
+                    merged = fitz.open(work_path)
+                    pages_since_checkpoint = 0
+            
+            # garbage=4 stores fonts and images shared between the inputs only once
+            output_path = os.path.join(work_dir, 'output.pdf')
+            with timed('write'):
+                merged.save(output_path, garbage=4, deflate=True, use_objstms=1)
+            merged.close()
+            merged = None
             
-            c.save()
+            output = tempfile.SpooledTemporaryFile(max_size=MERGE_SPOOL_BYTES)
+            with open(output_path, 'rb') as f:
+                shutil.copyfileobj(f, output, 1024 * 1024)
             output.seek(0)
             return output
+        except InvalidPasswordError:
+            raise
         except Exception as e:
-            raise Exception(f"Error converting images to PDF: {str(e)}")
-
+            raise Exception(f"Error merging PDFs: {str(e)}")
+        finally:
+            if merged is not None:
+                merged.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
     @staticmethod
-    def merge_pdfs(pdf_files):
-        """Merge multiple PDF files"""
-        try:
-            merger = PyPDF2.PdfMerger()
-            for pdf_file in pdf_files:
+    def _spool_to_file(pdf_file, path):
+        """Write an upload, parsed document or bytes to path without reading uploads into memory"""
+        if isinstance(pdf_file, ParsedDocument):
+            pdf_file = pdf_file.data
+        with open(path, 'wb') as f:
+            if isinstance(pdf_file, (bytes, bytearray)):
+                f.write(pdf_file)
+            else:
+                import shutil
                 pdf_file.seek(0)
-                merger.append(pdf_file)
-            output = io.BytesIO()
-            merger.write(output)
-            merger.close()
-            output.seek(0)
-            return output
+                shutil.copyfileobj(pdf_file, f, 1024 * 1024)
+    
+    @staticmethod
+    @instrumented('iter_split_pdf')
+    def iter_split_pdf(pdf_file, mode='pages', every=1, max_bytes=None, subset_fonts=False):
+        """Split PDF into parts, returning a generator of (first_page, filename, data)
+        
+        mode 'pages' cuts every `every` pages, 'bookmarks' at each top-level bookmark and 'size'
+        before a part would grow past max_bytes. Parts are copied out of the one opened document
+        and produced one at a time; subset_fonts trims the fonts each part carries.
+        """
+        if mode not in SPLIT_MODES:
+            raise ValueError(f"Unknown split mode: {mode}")
+        if mode == 'pages' and every < 1:
+            raise ValueError("every must be at least 1")
+        if mode == 'size' and not max_bytes:
+            raise ValueError("A size limit is required")
+        
+        try:
+            document = ParsedDocument.of(pdf_file)
+            with document.lock:
+                pdf_document = document.fitz_doc
+                page_count = len(pdf_document)
+                if mode == 'pages':
+                    starts = list(range(0, page_count, every))
+                elif mode == 'bookmarks':
+                    starts = sorted({page - 1 for level, _, page in pdf_document.get_toc(simple=True)
+                                     if level == 1 and 1 <= page <= page_count} | {0})
+        except InvalidPasswordError:
+            raise
         except Exception as e:
-            raise Exception(f"Error merging PDFs: {str(e)}")
+            raise Exception(f"Error splitting PDF: {str(e)}")
+        
+        document.pin()
+        
+        def split_parts():
+            document.lock.acquire()
+            try:
+                source = document.fitz_doc
+                if mode == 'size':
+                    parts = PDFProcessor._size_limited_parts(source, max_bytes, subset_fonts)
+                else:
+                    ranges = zip(starts, [start - 1 for start in starts[1:]] + [page_count - 1])
+                    parts = ((first, last, PDFProcessor._extract_pages(source, first, last, subset_fonts))
+                             for first, last in ranges if first <= last)
+                
+                for first, last, data in parts:
+                    count_pages(last - first + 1)
+                    yield first + 1, PDFProcessor._part_filename(first, last), data
+            finally:
+                document.lock.release()
+                document.release()
+        
+        return split_parts()
     
     @staticmethod
-    def split_pdf(pdf_file):
-        """Split PDF into individual pages with base64 data for direct download"""
+    def _extract_pages(source, first, last, subset_fonts=False):
+        """Copy pages first..last (0-based, inclusive) of an open document into a new PDF"""
+        part = fitz.open()
         try:
-            import base64
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            pages = []
+            part.insert_pdf(source, from_page=first, to_page=last)
+            if subset_fonts:
+                part.subset_fonts()
+            # garbage=3 drops whatever the copied pages do not reference
+            with timed('write'):
+                return part.tobytes(garbage=3, deflate=True)
+        finally:
+            part.close()
+    
+    @staticmethod
+    def _size_limited_parts(source, max_bytes, subset_fonts=False):
+        """Greedily pack consecutive pages into parts of at most max_bytes, yielding (first, last, data)
+        
+        Part sizes are estimated from the objects each page pulls in (shared fonts and images
+        counted once per part), scaled by how the previous part's estimate compared to its real
+        size. Each part is written once to check it; a part that comes out too big is cut down by
+        binary search, so it costs a few more writes rather than one per page. A page that is
+        bigger than the limit on its own becomes a part by itself.
+        """
+        page_objects = PDFProcessor._page_objects(source)
+        page_count = len(source)
+        scale = 1.0
+        first = 0
+        
+        def pack(first, scale):
+            """Extend a part while its estimated size stays under the limit"""
+            seen, estimate, last = set(), 0, first
+            for page_index in range(first, page_count):
+                added = sum(size for xref, size in page_objects[page_index].items() if xref not in seen)
+                if page_index > first and (estimate + added) * scale > max_bytes:
+                    break
+                seen.update(page_objects[page_index])
+                estimate += added
+                last = page_index
+            return last, estimate
+        
+        while first < page_count:
+            # A part that came out much smaller than estimated is packed again with the new scale
+            for _ in range(3):
+                last, estimate = pack(first, scale)
+                data = PDFProcessor._extract_pages(source, first, last, subset_fonts)
+                if len(data) > max_bytes or not estimate:
+                    break
+                previous_scale, scale = scale, len(data) / estimate
+                if last == page_count - 1 or scale >= previous_scale * 0.8:
+                    break
             
-            for page_num in range(len(pdf_reader.pages)):
-                writer = PyPDF2.PdfWriter()
-                writer.add_page(pdf_reader.pages[page_num])
-                
-                page_output = io.BytesIO()
-                writer.write(page_output)
-                page_output.seek(0)
-                
-                pdf_base64 = base64.b64encode(page_output.getvalue()).decode('utf-8')
-                pages.append({
-                    'page_num': page_num + 1,
-                    'filename': f'page_{page_num + 1:03d}.pdf',
-                    'data': pdf_base64
-                })
+            if len(data) > max_bytes and last > first:
+                # The estimate was short: find the longest part that fits
+                low, high, fitting = first, last - 1, None
+                while low <= high:
+                    middle = (low + high) // 2
+                    candidate = PDFProcessor._extract_pages(source, first, middle, subset_fonts)
+                    if len(candidate) <= max_bytes or middle == first:
+                        fitting, last_fitting = candidate, middle
+                        low = middle + 1
+                    else:
+                        high = middle - 1
+                data, last = fitting, last_fitting
             
-            return pages
-        except Exception as e:
-            raise Exception(f"Error splitting PDF: {str(e)}")
+            yield first, last, data
+            first = last + 1
+    
+    @staticmethod
+    def _page_objects(source):
+        """For each page, {xref: approximate bytes} of the objects copying it brings along: the page,
+        its contents and resources, followed through references but not into other pages"""
+        page_xrefs = {source.page_xref(i) for i in range(len(source))}
+        # The page tree is rebuilt for each part, so it does not count towards a page
+        for xref in list(page_xrefs):
+            parent = source.xref_get_key(xref, 'Parent')
+            while parent[0] == 'xref':
+                parent_xref = int(parent[1].split()[0])
+                if parent_xref in page_xrefs:
+                    break
+                page_xrefs.add(parent_xref)
+                parent = source.xref_get_key(parent_xref, 'Parent')
+        
+        sizes, references = {}, {}
+        
+        def visit(xref):
+            definition = source.xref_object(xref, compressed=True)
+            size = len(definition)
+            if source.xref_is_stream(xref):
+                length = source.xref_get_key(xref, 'Length')
+                size += int(length[1]) if length[0] == 'int' else len(source.xref_stream_raw(xref))
+            sizes[xref] = size
+            references[xref] = [int(ref) for ref in PDF_REFERENCE.findall(definition)]
+        
+        objects = []
+        for page_index in range(len(source)):
+            page_xref = source.page_xref(page_index)
+            found, stack = {}, [page_xref]
+            while stack:
+                xref = stack.pop()
+                if xref in found:
+                    continue
+                if xref not in sizes:
+                    visit(xref)
+                found[xref] = sizes[xref]
+                stack.extend(ref for ref in references[xref]
+                             if ref not in found and (ref not in page_xrefs or ref == page_xref))
+            objects.append(found)
+        return objects
+    
+    @staticmethod
+    def _part_filename(first, last):
+        if first == last:
+            return f'page_{first + 1:03d}.pdf'
+        return f'pages_{first + 1:03d}-{last + 1:03d}.pdf'
     
     @staticmethod
+    @instrumented('get_split_page')
     def get_split_page(pdf_file, page_num):
         """Get individual page from PDF"""
         try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            if page_num < 1 or page_num > len(pdf_reader.pages):
-                raise Exception("Invalid page number")
-            
-            writer = PyPDF2.PdfWriter()
-            writer.add_page(pdf_reader.pages[page_num - 1])
-            
-            output = io.BytesIO()
-            writer.write(output)
-            output.seek(0)
-            return output
+            document = ParsedDocument.of(pdf_file)
+            with document.lock:
+                pdf_document = document.fitz_doc
+                if page_num < 1 or page_num > len(pdf_document):
+                    raise Exception("Invalid page number")
+                
+                count_pages(1)
+                return io.BytesIO(PDFProcessor._extract_pages(pdf_document, page_num - 1, page_num - 1))
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"Error extracting page: {str(e)}")
     
     @staticmethod
-    def convert_selected_pdf_pages(pdf_file, selected_pages):
-        """Convert selected PDF pages to individual PDFs with base64 data"""
+    @instrumented('iter_selected_pdf_pages')
+    def iter_selected_pdf_pages(pdf_file, selected_pages):
+        """Extract selected pages as individual PDFs, returning a generator of (page_num, filename, data)"""
         try:
-            import base64
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            pdfs = []
-            
-            for page_num in selected_pages:
-                if page_num <= len(pdf_reader.pages) and page_num > 0:
-                    writer = PyPDF2.PdfWriter()
-                    writer.add_page(pdf_reader.pages[page_num - 1])
-                    
-                    page_output = io.BytesIO()
-                    writer.write(page_output)
-                    page_output.seek(0)
-                    
-                    pdf_base64 = base64.b64encode(page_output.getvalue()).decode('utf-8')
-                    pdfs.append({
-                        'page_num': page_num,
-                        'filename': f'page_{page_num:03d}.pdf',
-                        'data': pdf_base64
-                    })
-            
-            return pdfs
+            document = ParsedDocument.of(pdf_file)
+            # Parse now so a broken upload fails before the response starts streaming
+            document.fitz_doc
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"Error converting selected PDF pages: {str(e)}")
+        
+        selected_pages = PageSet.of(selected_pages)
+        document.pin()
+        
+        def extract_pages():
+            document.lock.acquire()
+            try:
+                pdf_document = document.fitz_doc
+                for page_num in selected_pages.pages(len(pdf_document)):
+                    data = PDFProcessor._extract_pages(pdf_document, page_num - 1, page_num - 1)
+                    count_pages(1)
+                    yield page_num, f'page_{page_num:03d}.pdf', data
+            finally:
+                document.lock.release()
+                document.release()
+        
+        return extract_pages()
     
     @staticmethod
-    def rotate_pdf(pdf_file, rotation):
-        """Rotate PDF pages"""
+    @instrumented('iter_rotated_pdf')
+    def iter_rotated_pdf(pdf_file, rotation, chunk_size=1024 * 1024):
+        """Rotate PDF pages, returning a generator of output chunks
+        
+        rotation is one angle for every page or a {page spec: angle} map such as
+        {"1-10": 90, "11": 180}; angles are added to each page's current rotation. The output is
+        the original file followed by an incremental update holding only the changed page
+        objects. Encrypted files, and files whose cross-reference data can't be extended, are
+        rewritten in full instead.
+        """
         try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            writer = PyPDF2.PdfWriter()
+            document = ParsedDocument.of(pdf_file)
+            try:
+                pdf_reader = document.reader
+            except PyPDF2.errors.DependencyError:
+                # PyPDF2 cannot open AES files without PyCryptodome; PyMuPDF can at least tell
+                # whether one needs a password
+                document.fitz_doc
+                raise
+            if pdf_reader.is_encrypted:
+                # Only files that open without a password (owner restrictions) are rewritten below
+                document.fitz_doc
+            angles = PDFProcessor._rotation_angles(rotation, len(pdf_reader.pages))
             
-            for page in pdf_reader.pages:
-                page.rotate(rotation)
-                writer.add_page(page)
+            update = None
+            if not pdf_reader.is_encrypted:
+                objects = {}
+                for index, angle in angles.items():
+                    if angle % 360 == 0:
+                        continue
+                    page = pdf_reader.pages[index]
+                    # Copy the page dictionary so a shared reader is left untouched
+                    rotated = DictionaryObject(page)
+                    current = int(page['/Rotate']) if '/Rotate' in page else 0
+                    rotated[NameObject('/Rotate')] = NumberObject((current + angle) % 360)
+                    ref = page.indirect_reference
+                    objects[(ref.idnum, ref.generation)] = rotated
+                
+                count_pages(len(objects))
+                with timed('write'):
+                    update = (PDFProcessor._incremental_update(document.data, pdf_reader, objects)
+                              if objects else b'')
             
-            output = io.BytesIO()
-            writer.write(output)
-            output.seek(0)
-            return output
+            if update is not None:
+                data = document.data
+            else:
+                writer = PyPDF2.PdfWriter()
+                for index, page in enumerate(pdf_reader.pages):
+                    # Rotate the writer's copy so a shared reader is left untouched
+                    added = writer.add_page(page)
+                    if angles.get(index, 0) % 360:
+                        added.rotate(angles[index])
+                
+                count_pages(len(writer.pages))
+                output = io.BytesIO()
+                with timed('write'):
+                    writer.write(output)
+                data, update = output.getvalue(), b''
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"Error rotating PDF: {str(e)}")
+        
+        def chunks():
+            for start in range(0, len(data), chunk_size):
+                yield data[start:start + chunk_size]
+            if update:
+                yield update
+        return chunks()
+    
+    @staticmethod
+    def _rotation_angles(rotation, page_count):
+        """{page_index: angle} for one angle or a {page spec: angle} map (later entries win)"""
+        items = rotation.items() if isinstance(rotation, dict) else [('1-', rotation)]
+        angles = {}
+        for spec, angle in items:
+            angle = int(angle)
+            if angle % 90:
+                raise ValueError(f"Rotation must be a multiple of 90: {angle}")
+            for page_num in PageSet(spec).pages(page_count, sorted_pages=True):
+                angles[page_num - 1] = angle
+        return angles
+    
+    @staticmethod
+    def _incremental_update(data, pdf_reader, objects):
+        """Bytes to append to data so that objects {(idnum, generation): PdfObject} replace the
+        file's current versions, or None when the file's last cross-reference section can't be found
+        
+        The update ends in a cross-reference table or stream, matching the section it follows.
+        """
+        match = None
+        for match in re.finditer(rb'startxref\s+(\d+)', data[-2048:]):
+            pass
+        if match is None:
+            return None
+        prev = int(match.group(1))
+        if data[prev:prev + 4] == b'xref':
+            xref_stream = False
+        elif re.match(rb'\d+\s+\d+\s+obj\b', data[prev:prev + 64]):
+            xref_stream = True
+        else:
+            return None
+        
+        update = io.BytesIO()
+        update.write(b'\n')
+        entries = {}
+        for (idnum, generation), obj in sorted(objects.items()):
+            entries[idnum] = (len(data) + update.tell(), generation)
+            update.write(f'{idnum} {generation} obj\n'.encode())
+            obj.write_to_stream(update, None)
+            update.write(b'\nendobj\n')
+        
+        trailer = DictionaryObject()
+        for key in ('/Root', '/Info', '/ID'):
+            if key in pdf_reader.trailer:
+                trailer[NameObject(key)] = pdf_reader.trailer.raw_get(key)
+        trailer[NameObject('/Prev')] = NumberObject(prev)
+        # PyPDF2 drops /Size from cross-reference stream trailers; the highest known object also bounds it
+        known = itertools.chain(entries, pdf_reader.xref_objStm, *pdf_reader.xref.values())
+        size = max(int(pdf_reader.trailer.get('/Size', 0)), max(known, default=0) + 1)
+        xref_offset = len(data) + update.tell()
+        if xref_stream:
+            # The cross-reference stream is itself the next object
+            entries[size] = (xref_offset, 0)
+            size += 1
+        trailer[NameObject('/Size')] = NumberObject(size)
+        
+        # Runs of consecutive object numbers
+        subsections = []
+        for idnum in sorted(entries):
+            if subsections and subsections[-1][0] + subsections[-1][1] == idnum:
+                subsections[-1][1] += 1
+            else:
+                subsections.append([idnum, 1])
+        
+        if xref_stream:
+            offset_width = max(1, (xref_offset.bit_length() + 7) // 8)
+            rows = b''.join(b'\x01' + offset.to_bytes(offset_width, 'big') + generation.to_bytes(2, 'big')
+                            for offset, generation in (entries[idnum] for idnum in sorted(entries)))
+            trailer[NameObject('/Type')] = NameObject('/XRef')
+            trailer[NameObject('/W')] = ArrayObject(NumberObject(w) for w in (1, offset_width, 2))
+            trailer[NameObject('/Index')] = ArrayObject(NumberObject(n) for run in subsections for n in run)
+            trailer[NameObject('/Length')] = NumberObject(len(rows))
+            update.write(f'{size - 1} 0 obj\n'.encode())
+            trailer.write_to_stream(update, None)
+            update.write(b'\nstream\n' + rows + b'\nendstream\nendobj\n')
+        else:
+            update.write(b'xref\n')
+            for first, count in subsections:
+                update.write(f'{first} {count}\n'.encode())
+                for idnum in range(first, first + count):
+                    offset, generation = entries[idnum]
+                    update.write(f'{offset:010d} {generation:05d} n\r\n'.encode())
+            update.write(b'trailer\n')
+            trailer.write_to_stream(update, None)
+        
+        update.write(f'\nstartxref\n{xref_offset}\n%%EOF\n'.encode())
+        return update.getvalue()
     
     @staticmethod
+    @instrumented('delete_pages')
     def delete_pages(pdf_file, pages_to_delete):
-        """Delete specific pages from PDF"""
+        """Delete specific pages from PDF
+        
+        The kept pages are selected in one pass over a private PyMuPDF copy, and objects only the
+        deleted pages used (images, fonts, content streams) are dropped when it is saved.
+        """
         try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            writer = PyPDF2.PdfWriter()
-            
-            total_pages = len(pdf_reader.pages)
-            pages_to_delete = set(pages_to_delete)
+            document = ParsedDocument.of(pdf_file)
+            pdf_document = document.open_copy()
             
-            for page_num in range(total_pages):
-                if (page_num + 1) not in pages_to_delete:
-                    writer.add_page(pdf_reader.pages[page_num])
+            try:
+                total_pages = len(pdf_document)
+                deleted = PageSet.of(pages_to_delete).pages(total_pages, sorted_pages=True)
+                next_deleted = next(deleted, None)
+                
+                kept = []
+                for page_num in range(1, total_pages + 1):
+                    if page_num == next_deleted:
+                        next_deleted = next(deleted, None)
+                    else:
+                        kept.append(page_num - 1)
+                if not kept:
+                    raise ValueError("Cannot delete every page")
+                
+                if len(kept) < total_pages:
+                    pdf_document.select(kept)
+                count_pages(len(kept))
+                
+                # clean rebuilds each kept page's resources from what its content actually uses, so
+                # resource dictionaries shared with deleted pages stop holding their images and fonts;
+                # garbage=3 then keeps only objects still reachable from the kept pages
+                output = io.BytesIO()
+                with timed('write'):
+                    pdf_document.save(output, garbage=3, clean=True, deflate=True)
+            finally:
+                pdf_document.close()
             
-            output = io.BytesIO()
-            writer.write(output)
             output.seek(0)
             return output
+        except (ValueError, InvalidPasswordError):
+            raise
         except Exception as e:
             raise Exception(f"Error deleting pages: {str(e)}")
     
     @staticmethod
-    def compress_pdf(pdf_file):
-        """Compress PDF file"""
+    @instrumented('compress_pdf')
+    def compress_pdf(pdf_file, level=DEFAULT_COMPRESSION_LEVEL, progress=None):
+        """Compress PDF file at the given level (lossless, balanced or aggressive)
+        
+        Lossy levels save the document before and after re-encoding its images and keep the
+        smaller file. Image rewriting, font subsetting and each save are one call over the whole
+        document, so progress(done, total) is reported per step.
+        """
+        level = COMPRESSION_LEVEL_ALIASES.get(level, level)
+        if level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level: {level}")
+        settings = COMPRESSION_LEVELS[level]
+        
         try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            writer = PyPDF2.PdfWriter()
+            document = ParsedDocument.of(pdf_file)
+            # Work on a private copy; the shared parse must stay unmodified
+            pdf_document = document.open_copy()
             
-            for page in pdf_reader.pages:
-                page.compress_content_streams()
-                writer.add_page(page)
+            lossy = settings['quality'] is not None
+            steps = 1 + 2 * lossy + settings['subset_fonts']
+            done = 0
             
-            output = io.BytesIO()
-            writer.write(output)
-            output.seek(0)
-            return output
+            def step():
+                nonlocal done
+                done += 1
+                if progress:
+                    progress(done, steps)
+            
+            try:
+                count_pages(len(pdf_document))
+                if progress:
+                    progress(0, steps)
+                
+                if settings['subset_fonts']:
+                    with timed('fonts'):
+                        pdf_document.subset_fonts()
+                    step()
+                
+                if settings['strip_metadata']:
+                    pdf_document.set_metadata({})
+                    pdf_document.del_xml_metadata()
+                
+                with timed('write'):
+                    data = PDFProcessor._save_compressed(pdf_document)
+                step()
+                
+                if lossy:
+                    with timed('images'):
+                        pdf_document.rewrite_images(
+                            dpi_threshold=settings['dpi_threshold'],
+                            dpi_target=settings['dpi_target'],
+                            quality=settings['quality']
+                        )
+                    step()
+                    with timed('write'):
+                        recompressed = PDFProcessor._save_compressed(pdf_document)
+                    step()
+                    # JPEG loses to Flate on flat colours and line art; keep whichever is smaller
+                    if len(recompressed) < len(data):
+                        data = recompressed
+            finally:
+                pdf_document.close()
+            
+            # Never hand back a bigger file than we were given
+            if len(data) >= len(document.data):
+                data = document.data
+            return io.BytesIO(data)
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"Error compressing PDF: {str(e)}")
     
     @staticmethod
+    def _save_compressed(pdf_document):
+        """Serialize with every lossless saving: garbage=4 drops unused objects and merges
+        duplicate ones (fonts, images, streams), streams are deflated and objects packed into
+        object streams"""
+        return pdf_document.tobytes(
+            garbage=4,
+            clean=True,
+            deflate=True,
+            deflate_images=True,
+            deflate_fonts=True,
+            use_objstms=1
+        )
+    
+    @staticmethod
+    @instrumented('unlock_pdf')
     def unlock_pdf(pdf_file, password):
         """Remove password protection from PDF"""
         try:
-            pdf_file.seek(0)
+            # Documents from request_document were already decrypted with the same password
+            document = pdf_file if isinstance(pdf_file, ParsedDocument) else ParsedDocument(pdf_file, password)
             
             # Try PyMuPDF first
             try:
-                pdf_bytes = pdf_file.read()
-                pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-                
-                if pdf_document.needs_pass:
-                    if not pdf_document.authenticate(password):
-                        pdf_document.close()
-                        raise Exception("Invalid password")
+                pdf_document = document.fitz_doc
                 
                 output = io.BytesIO()
-                pdf_document.save(output)
-                pdf_document.close()
+                with timed('write'):
+                    pdf_document.save(output)
                 output.seek(0)
                 return output
                 
+            except InvalidPasswordError:
+                # PyMuPDF read the file fine; PyPDF2 would only reject the password again
+                raise
             except Exception:
                 # Fallback to PyPDF2
-                pdf_file.seek(0)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
+                pdf_reader = document.reader
                 
                 if pdf_reader.is_encrypted:
                     if not pdf_reader.decrypt(password):
-                        raise Exception("Invalid password")
+                        raise InvalidPasswordError("Invalid password")
                 
                 writer = PyPDF2.PdfWriter()
                 for page in pdf_reader.pages:
                     writer.add_page(page)
                 
                 output = io.BytesIO()
-                writer.write(output)
+                with timed('write'):
+                    writer.write(output)
                 output.seek(0)
                 return output
                 
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             raise Exception(f"Error unlocking PDF: {str(e)}")
     
     @staticmethod
+    @instrumented('protect_pdf')
     def protect_pdf(pdf_file, password, owner_password=None):
         """Add strong encryption to PDF using PyMuPDF"""
+        document = ParsedDocument.of(pdf_file)
         try:
-            pdf_file.seek(0)
-            pdf_bytes = pdf_file.read()
-            
             # Use PyMuPDF for stronger encryption
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            pdf_document = document.fitz_doc
             
             # Set strong encryption parameters
             encrypt_meth = fitz.PDF_ENCRYPT_AES_256  # AES-256 encryption
@@ -574,23 +2713,24 @@ class PDFProcessor:
             
             # Apply encryption
             output = io.BytesIO()
-            pdf_document.save(
-                output,
-                encryption=encrypt_meth,
-                owner_pw=owner_pw,
-                user_pw=user_pw,
-                permissions=permissions
-            )
+            with timed('encrypt'):
+                pdf_document.save(
+                    output,
+                    encryption=encrypt_meth,
+                    owner_pw=owner_pw,
+                    user_pw=user_pw,
+                    permissions=permissions
+                )
             
-            pdf_document.close()
             output.seek(0)
             return output
             
+        except InvalidPasswordError:
+            raise
         except Exception as e:
             # Fallback to PyPDF2 if PyMuPDF fails
             try:
-                pdf_file.seek(0)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
+                pdf_reader = document.reader
                 writer = PyPDF2.PdfWriter()
                 
                 for page in pdf_reader.pages:
@@ -604,48 +2744,40 @@ class PDFProcessor:
                 )
                 
                 output = io.BytesIO()
-                writer.write(output)
+                with timed('write'):
+                    writer.write(output)
                 output.seek(0)
                 return output
             except Exception as fallback_error:
                 raise Exception(f"Error protecting PDF: {str(e)} | Fallback error: {str(fallback_error)}")
     
     @staticmethod
+    @instrumented('word_to_pdf')
     def word_to_pdf(word_file):
-        """Convert Word document to PDF"""
+        """Convert Word document (.docx) to PDF with python-docx and reportlab, without an office suite"""
         try:
-            from docx2pdf import convert
-            import tempfile
-            import os
-            
-            # Save uploaded file to temp location
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_word:
-                word_file.seek(0)
-                temp_word.write(word_file.read())
-                temp_word_path = temp_word.name
-            
-            # Convert to PDF
-            temp_pdf_path = temp_word_path.replace('.docx', '.pdf')
-            convert(temp_word_path, temp_pdf_path)
-            
-            # Read PDF and return as BytesIO
-            output = io.BytesIO()
-            with open(temp_pdf_path, 'rb') as pdf_file:
-                output.write(pdf_file.read())
-            
-            # Cleanup temp files
-            os.unlink(temp_word_path)
-            os.unlink(temp_pdf_path)
+            word_file.seek(0)
+            data = word_file.read()
+            if WORD_WORKERS > 1:
+                pool = word_pool()
+                try:
+                    with timed('convert'):
+                        pdf_data, page_count = pool.submit(_word_worker_render, data).result()
+                except BrokenProcessPool:
+                    _reset_word_pool(pool)
+                    raise
+            else:
+                _word_worker_init()
+                pdf_data, page_count = DocxRenderer(data, timed=timed).render()
+            count_pages(page_count)
             
-            output.seek(0)
-            return output
+            return io.BytesIO(pdf_data)
             
-        except ImportError:
-            raise Exception("docx2pdf library not available. Install with: pip install docx2pdf")
         except Exception as e:
             raise Exception(f"Error converting Word to PDF: {str(e)}")
     
     @staticmethod
+    @instrumented('excel_to_pdf')
     def excel_to_pdf(excel_file):
         """Convert Excel spreadsheet to PDF"""
         try:
@@ -680,124 +2812,588 @@ class PDFProcessor:
             ]))
             
             # Build PDF
-            doc.build([table])
+            with timed('convert'):
+                doc.build([table])
             output.seek(0)
             return output
             
         except Exception as e:
             raise Exception(f"Error converting Excel to PDF: {str(e)}")
 
+class JobQueue:
+    """Long conversions run by a bounded worker pool, with job state kept in a local directory"""
+    
+    def __init__(self, directory, workers, ttl, operations):
+        self.directory = directory
+        self.workers = workers
+        self.ttl = ttl
+        self.operations = operations
+        self._lock = threading.Lock()
+        self._executor = None
+    
+    def _start(self):
+        """Create the pool on first use and requeue jobs interrupted by a restart"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdfgears-job')
+            os.makedirs(self.directory, exist_ok=True)
+            for job_id in sorted(os.listdir(self.directory)):
+                job = self._load(job_id)
+                if job and job['status'] in ('queued', 'running'):
+                    self._save(dict(job, status='queued'))
+                    self._executor.submit(self._run, job_id)
+    
+    def _job_dir(self, job_id):
+        if not job_id.isalnum():
+            raise KeyError(job_id)
+        return os.path.join(self.directory, job_id)
+    
+    def _load(self, job_id):
+        try:
+            with open(os.path.join(self._job_dir(job_id), 'job.json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _save(self, job):
+        path = os.path.join(self._job_dir(job['id']), 'job.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(job, f)
+        os.replace(path + '.tmp', path)
+    
+    def _update(self, job_id, **changes):
+        with self._lock:
+            job = self._load(job_id)
+            job.update(changes)
+            self._save(job)
+            return job
+    
+    def submit(self, operation, uploads, params):
+        """Persist the uploads and queue the operation; returns the job id"""
+        import uuid
+        
+        if operation not in self.operations:
+            raise ValueError(f"Unknown operation: {operation}")
+        self._start()
+        self._purge_expired()
+        
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        for i, upload in enumerate(uploads):
+            upload.seek(0)
+            upload.save(os.path.join(job_dir, f'input-{i}'))
+        
+        self._save({
+            'id': job_id,
+            'operation': operation,
+            'params': params,
+            'inputs': len(uploads),
+            'status': 'queued',
+            'progress': {'done': 0, 'total': None},
+            'error': None,
+            'created': time.time(),
+            'finished': None,
+        })
+        self._executor.submit(self._run, job_id)
+        return job_id
+    
+    def _run(self, job_id):
+        job = self._update(job_id, status='running', error=None)
+        job_dir = self._job_dir(job_id)
+        
+        def progress(done, total):
+            self._update(job_id, progress={'done': done, 'total': total})
+        
+        try:
+            inputs = []
+            for i in range(job['inputs']):
+                with open(os.path.join(job_dir, f'input-{i}'), 'rb') as f:
+                    inputs.append(f.read())
+            
+            result, download_name, mimetype = self.operations[job['operation']](inputs, job['params'], progress)
+            
+            result_path = os.path.join(job_dir, 'result')
+            with open(result_path + '.tmp', 'wb') as f:
+                if hasattr(result, 'read'):
+                    result.seek(0)
+                    for chunk in iter(lambda: result.read(1024 * 1024), b''):
+                        f.write(chunk)
+                else:
+                    for chunk in result:
+                        f.write(chunk)
+            os.replace(result_path + '.tmp', result_path)
+            
+            self._update(job_id, status='done', download_name=download_name,
+                         mimetype=mimetype, finished=time.time())
+        except Exception as e:
+            self._update(job_id, status='failed', error=str(e), finished=time.time())
+        finally:
+            for i in range(job['inputs']):
+                try:
+                    os.unlink(os.path.join(job_dir, f'input-{i}'))
+                except OSError:
+                    pass
+    
+    def _purge_expired(self):
+        import shutil
+        
+        cutoff = time.time() - self.ttl
+        for job_id in os.listdir(self.directory):
+            job = self._load(job_id)
+            if job and job.get('finished') and job['finished'] < cutoff:
+                shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+    
+    def status(self, job_id):
+        self._start()
+        job = self._load(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return {key: job.get(key) for key in
+                ('id', 'operation', 'status', 'progress', 'error', 'created', 'finished')}
+    
+    def result(self, job_id):
+        """Return (path, download_name, mimetype) of a finished job"""
+        job = self._load(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job['status'] != 'done':
+            raise ValueError(f"Job is {job['status']}")
+        return os.path.join(self._job_dir(job_id), 'result'), job['download_name'], job['mimetype']
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+def _job_pdf_to_word(inputs, params, progress):
+    return PDFProcessor.pdf_to_word(inputs[0], progress), 'converted.docx', DOCX_MIMETYPE
+
+def _job_pdf_to_excel(inputs, params, progress):
+    return PDFProcessor.pdf_to_excel(inputs[0], progress), 'converted.xlsx', XLSX_MIMETYPE
+
+def _job_pdf_to_images(inputs, params, progress):
+    image_format = params.get('format', 'png')
+    quality = int(params.get('quality', 2))
+    return (PDFProcessor.pdf_to_images(inputs[0], image_format, quality, progress),
+            'images.zip', 'application/zip')
+
+def _job_word_to_pdf(inputs, params, progress):
+    return PDFProcessor.word_to_pdf(io.BytesIO(inputs[0])), 'converted.pdf', 'application/pdf'
+
+def _job_compress_pdf(inputs, params, progress):
+    level = params.get('compression_level', DEFAULT_COMPRESSION_LEVEL)
+    return PDFProcessor.compress_pdf(inputs[0], level, progress), 'compressed.pdf', 'application/pdf'
+
+def _job_merge_pdf(inputs, params, progress):
+    return PDFProcessor.merge_pdfs(inputs, progress=progress), 'merged.pdf', 'application/pdf'
+
+job_queue = JobQueue(JOB_DIR, JOB_WORKERS, JOB_TTL, {
+    'pdf-to-word': _job_pdf_to_word,
+    'pdf-to-excel': _job_pdf_to_excel,
+    'pdf-to-images': _job_pdf_to_images,
+    'word-to-pdf': _job_word_to_pdf,
+    'compress-pdf': _job_compress_pdf,
+    'merge-pdf': _job_merge_pdf,
+})
+
+def _batch_worker(operation, name, data, password, owner_password=None):
+    """Protect or unlock one batch file in a pool process, returning (name, data, status, error)"""
+    try:
+        if operation == 'protect-pdf':
+            result = PDFProcessor.protect_pdf(data, password, owner_password)
+        else:
+            result = PDFProcessor.unlock_pdf(data, password)
+        return name, result.getvalue(), 'ok', None
+    except InvalidPasswordError as e:
+        return name, None, 'invalid_password', str(e)
+    except Exception as e:
+        return name, None, 'error', str(e)
+
+BATCH_OPERATIONS = ('protect-pdf', 'unlock-pdf')
+
+def iter_batch_inputs(files):
+    """Yield (name, data) for each (filename, file object) PDF, expanding ZIP files into their
+    PDF members
+    
+    Names are made relative and unique; each file is read only when its turn comes.
+    """
+    seen = {BATCH_MANIFEST}
+    
+    def unique(name):
+        parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+        name = '/'.join(parts) or 'document.pdf'
+        base, ext = os.path.splitext(name)
+        candidate, n = name, 1
+        while candidate in seen:
+            candidate, n = f'{base}-{n}{ext}', n + 1
+        seen.add(candidate)
+        return candidate
+    
+    for filename, stream in files:
+        with stream:
+            if zipfile.is_zipfile(stream):
+                stream.seek(0)
+                with zipfile.ZipFile(stream) as archive:
+                    for info in archive.infolist():
+                        if not info.is_dir() and info.filename.lower().endswith('.pdf'):
+                            yield unique(info.filename), archive.read(info)
+            else:
+                stream.seek(0)
+                yield unique(filename or 'document.pdf'), stream.read()
+
+def run_batch(operation, inputs, password=None, owner_password=None, passwords=None, workers=None):
+    """Run protect-pdf or unlock-pdf over (name, data) inputs across a process pool, yielding
+    (name, data, status, error) in input order
+    
+    passwords maps file names to their own password; the others use password.
+    """
+    from collections import deque
+    
+    if operation not in BATCH_OPERATIONS:
+        raise ValueError(f"Unknown batch operation: {operation}")
+    workers = workers or BATCH_WORKERS
+    passwords = passwords or {}
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        inputs = iter(inputs)
+        exhausted = False
+        while not exhausted or pending:
+            while not exhausted and len(pending) < workers * 2:
+                item = next(inputs, None)
+                if item is None:
+                    exhausted = True
+                    break
+                name, data = item
+                file_password = passwords.get(name, password)
+                if not file_password:
+                    pending.append((name, None, 'error', 'No password given for this file'))
+                else:
+                    pending.append(executor.submit(_batch_worker, operation, name, data,
+                                                   file_password, owner_password))
+            
+            if pending:
+                result = pending.popleft()
+                if not isinstance(result, tuple):
+                    with timed('batch'):
+                        result = result.result()
+                yield result
+
+def stream_batch_zip(results):
+    """Yield a ZIP of the batch's output files followed by a manifest with each file's status"""
+    manifest = []
+    
+    def entries():
+        for name, data, status, error in results:
+            manifest.append({'name': name, 'status': status, 'error': error,
+                             'size': len(data) if data is not None else None})
+            if data is not None:
+                yield name, data
+        yield BATCH_MANIFEST, json.dumps({
+            'files': manifest,
+            'succeeded': sum(1 for entry in manifest if entry['status'] == 'ok'),
+            'failed': sum(1 for entry in manifest if entry['status'] != 'ok'),
+        }, indent=2)
+    
+    return stream_zip(entries())
+
 # API Routes
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_timing(response):
+    """Observe request latency and, when enabled, report stage timings as a Server-Timing header
+    
+    The latency is observed when the server closes the response, after the last chunk of a
+    streamed body. Headers go out before a streamed body is generated, so there the
+    Server-Timing stages and total cover only the work done before the first byte.
+    """
+    started = g.get('request_started')
+    if started is None:
+        return response
+    labels = {'endpoint': request.endpoint or 'unknown', 'status': str(response.status_code)}
+    response.call_on_close(
+        lambda: metrics.observe('pdfgears_request_seconds', labels, time.perf_counter() - started))
+    
+    if TIMING_HEADER:
+        elapsed = time.perf_counter() - started
+        stages = OrderedDict()
+        for stage, seconds in g.get('timings', []):
+            stages[stage] = stages.get(stage, 0) + seconds
+        entries = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in stages.items()]
+        entries.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+@app.after_request
+def add_parse_counters(response):
+    """Report how many PDF parses this request performed and avoided"""
+    documents = g.get('parsed_documents')
+    if documents:
+        response.headers['X-PDF-Parses'] = str(sum(d.parses for d in documents))
+        response.headers['X-PDF-Parses-Avoided'] = str(sum(d.parses_avoided for d in documents))
+    return response
+
+@app.teardown_request
+def close_parsed_documents(exc):
+    for document in g.pop('document_locks', []):
+        document.lock.release()
+        document.release()
+    for document in g.pop('parsed_documents', []):
+        document.close()
+
+@app.route('/api/documents', methods=['POST'])
+def upload_document():
+    try:
+        file = ParsedDocument(request.files['file'], request.form.get('password'))
+        stored = document_store.get(file.digest, pin=True)
+        document = _lock_stored_document(stored) if stored is not None else file
+        with document.lock:
+            page_count = len(document.fitz_doc)
+        handle = document_store.add(document)
+        return jsonify({'document': handle, 'page_count': page_count, 'expires_in': DOCUMENT_TTL})
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/documents/<handle>', methods=['DELETE'])
+def delete_document(handle):
+    if not document_store.remove(handle):
+        return jsonify({'error': 'Unknown or expired document handle'}), 404
+    return jsonify({'deleted': handle})
+
 @app.route('/api/pdf-to-word', methods=['POST'])
+@cached_result()
 def pdf_to_word():
     try:
-        file = request.files['file']
+        file = request_document()
         result = PDFProcessor.pdf_to_word(file)
         return send_file(result, as_attachment=True, download_name='converted.docx', 
-                        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+                        mimetype=DOCX_MIMETYPE)
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/pdf-to-excel', methods=['POST'])
+@cached_result()
 def pdf_to_excel():
     try:
-        file = request.files['file']
+        file = request_document()
         result = PDFProcessor.pdf_to_excel(file)
         return send_file(result, as_attachment=True, download_name='converted.xlsx', 
-                        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+                        mimetype=XLSX_MIMETYPE)
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/pdf-to-images', methods=['POST'])
+@cached_result('format', 'quality')
+def pdf_to_images():
+    try:
+        file = request_document()
+        image_format = request.form.get('format', 'png')
+        quality = int(request.form.get('quality', 2))
+        result = PDFProcessor.pdf_to_images(file, image_format, quality)
+        return Response(stream_with_context(result), mimetype='application/zip',
+                        headers={'Content-Disposition': 'attachment; filename=images.zip'})
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/scan-pdf', methods=['POST'])
 def scan_pdf():
     try:
-        file = request.files['file']
-        pages = PDFProcessor.scan_pdf_pages(file)
-        return jsonify({'pages': pages})
+        file = request_document(shared=True)
+        # A re-scan of the same file reuses the stored document (and its cached thumbnails)
+        stored = document_store.get(file.digest, pin=True)
+        document = _lock_stored_document(stored) if stored is not None else file
+        with document.lock:
+            page_count = len(document.fitz_doc)
+        token = document_store.add(document)
+        
+        # Previews are fetched lazily, a range at a time, from the thumbnails endpoint
+        return jsonify({
+            'token': token,
+            'page_count': page_count,
+            'thumbnails_url': f'/api/thumbnails/{token}'
+        })
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/thumbnails/<token>', methods=['GET'])
+def thumbnails(token):
+    try:
+        document = document_store.get(token, pin=True)
+        if document is None:
+            return jsonify({'error': 'Unknown or expired document token, scan the PDF again'}), 404
+        _lock_stored_document(document)
+        
+        first_page = int(request.args.get('from', 1))
+        last_page = int(request.args.get('to', first_page + THUMBNAIL_BATCH_LIMIT - 1))
+        last_page = min(last_page, first_page + THUMBNAIL_BATCH_LIMIT - 1)
+        scale = min(max(float(request.args.get('scale', 0.5)), 0.1), 2.0)
+        
+        pages = PDFProcessor.render_thumbnails(document, first_page, last_page, scale)
+        response = jsonify({'token': token, 'pages': pages})
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+        return response
+    except ValueError:
+        return jsonify({'error': 'Invalid page range or scale'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/convert-pages', methods=['POST'])
+@cached_result('pages', 'format', 'quality')
 def convert_pages():
     try:
-        file = request.files['file']
-        selected_pages = list(map(int, request.form.get('pages', '').split(',')))
+        file = request_document()
+        try:
+            selected_pages = PageSet(request.form.get('pages', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         image_format = request.form.get('format', 'png')
         quality = int(request.form.get('quality', 2))
         
-        images = PDFProcessor.convert_selected_pages(file, selected_pages, image_format, quality)
-        return jsonify({'images': images})
+        images = PDFProcessor.iter_selected_pages(file, selected_pages, image_format, quality)
+        mimetype = 'image/jpeg' if image_format.lower() == 'jpg' else 'image/png'
+        return page_files_response(images, 'images', mimetype)
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/images-to-pdf', methods=['POST'])
+@cached_result('page_size', 'fit_mode', 'dpi')
 def images_to_pdf():
     try:
         files = request.files.getlist('files')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
         page_size = request.form.get('page_size', 'letter')
         fit_mode = request.form.get('fit_mode', 'fit')
-        result = PDFProcessor.images_to_pdf(files, page_size, fit_mode)
+        try:
+            dpi = int(request.form.get('dpi') or 0)
+        except ValueError:
+            return jsonify({'error': 'dpi must be a number'}), 400
+        if dpi < 0:
+            return jsonify({'error': 'dpi must not be negative'}), 400
+        
+        result = PDFProcessor.images_to_pdf(files, page_size, fit_mode, dpi or None)
         return send_file(result, as_attachment=True, download_name='images_to_pdf.pdf', 
                         mimetype='application/pdf')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/merge-pdf', methods=['POST'])
+@cached_result()
 def merge_pdf():
     try:
+        # Uploads are handed over as-is; merge_pdfs spools them to disk
         files = request.files.getlist('files')
-        result = PDFProcessor.merge_pdfs(files)
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        result = PDFProcessor.merge_pdfs(files, request.form.get('password'))
         return send_file(result, as_attachment=True, download_name='merged.pdf', 
                         mimetype='application/pdf')
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/split-pdf', methods=['POST'])
+@cached_result('mode', 'every', 'max_size_mb', 'subset_fonts')
 def split_pdf():
     try:
-        file = request.files['file']
-        pages = PDFProcessor.split_pdf(file)
-        return jsonify({'pages': pages})
+        file = request_document()
+        mode = request.form.get('mode', 'pages').strip().lower()
+        if mode not in SPLIT_MODES:
+            return jsonify({'error': f'Invalid split mode: {mode}'}), 400
+        try:
+            every = int(request.form.get('every', 1))
+            max_size_mb = float(request.form.get('max_size_mb') or 0)
+        except ValueError:
+            return jsonify({'error': 'every and max_size_mb must be numbers'}), 400
+        if every < 1:
+            return jsonify({'error': 'every must be at least 1'}), 400
+        if mode == 'size' and max_size_mb <= 0:
+            return jsonify({'error': 'max_size_mb is required for size splits'}), 400
+        subset_fonts = request.form.get('subset_fonts', '').strip().lower() in ('1', 'true', 'yes')
+        
+        pages = PDFProcessor.iter_split_pdf(file, mode, every, int(max_size_mb * 1024 * 1024), subset_fonts)
+        return page_files_response(pages, 'pages', 'application/pdf')
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/download-split-page', methods=['POST'])
+@cached_result('page_num')
 def download_split_page():
     try:
-        file = request.files['file']
+        file = request_document(shared=True)
         page_num = int(request.form.get('page_num', 1))
         
         result = PDFProcessor.get_split_page(file, page_num)
         return send_file(result, as_attachment=True, 
                         download_name=f'page_{page_num:03d}.pdf', 
                         mimetype='application/pdf')
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/convert-selected-pdf-pages', methods=['POST'])
+@cached_result('pages')
 def convert_selected_pdf_pages():
     try:
-        file = request.files['file']
-        selected_pages = list(map(int, request.form.get('pages', '').split(',')))
-        
-        if not selected_pages:
-            return jsonify({'error': 'No pages selected'}), 400
+        file = request_document()
+        try:
+            selected_pages = PageSet(request.form.get('pages', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        pdfs = PDFProcessor.convert_selected_pdf_pages(file, selected_pages)
-        return jsonify({'pdfs': pdfs})
+        pdfs = PDFProcessor.iter_selected_pdf_pages(file, selected_pages)
+        return page_files_response(pdfs, 'pdfs', 'application/pdf')
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/download-all-split-pages', methods=['POST'])
 def download_all_split_pages():
     try:
-        file = request.files['file']
-        file.seek(0)
-        pdf_reader = PyPDF2.PdfReader(file)
+        file = request_document(shared=True)
+        # PyMuPDF rather than PyPDF2, which cannot open AES files without PyCryptodome and would
+        # hide a missing password behind that error
+        page_count = len(file.fitz_doc)
         
         # Create individual PDF files and return as JSON with download links
         pages_info = []
-        for page_num in range(len(pdf_reader.pages)):
+        for page_num in range(page_count):
             pages_info.append({
                 'page_num': page_num + 1,
                 'filename': f'page_{page_num + 1:03d}.pdf',
@@ -806,52 +3402,97 @@ def download_all_split_pages():
         
         return jsonify({
             'message': 'PDF split successfully',
-            'total_pages': len(pdf_reader.pages),
+            'total_pages': page_count,
             'pages': pages_info,
             'download_instruction': 'Use download-split-page endpoint with page_num to download individual pages'
         })
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/rotate-pdf', methods=['POST'])
+@cached_result('rotation', 'rotations')
 def rotate_pdf():
     try:
-        file = request.files['file']
-        rotation = int(request.form.get('rotation', 90))
-        result = PDFProcessor.rotate_pdf(file, rotation)
-        return send_file(result, as_attachment=True, download_name='rotated.pdf', 
-                        mimetype='application/pdf')
+        file = request_document()
+        try:
+            rotation = int(request.form.get('rotation', 90))
+            if request.form.get('rotations'):
+                # Per-page rotations: {"1-10": 90, "11": 180}
+                rotation = json.loads(request.form['rotations'])
+                if not isinstance(rotation, dict) or not rotation:
+                    raise ValueError("rotations must map page ranges to angles")
+            for spec, angle in (rotation.items() if isinstance(rotation, dict) else [('1-', rotation)]):
+                PageSet(spec)
+                if int(angle) % 90:
+                    raise ValueError(f"Rotation must be a multiple of 90: {angle}")
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        chunks = PDFProcessor.iter_rotated_pdf(file, rotation)
+        return Response(stream_with_context(chunks), mimetype='application/pdf',
+                        headers={'Content-Disposition': 'attachment; filename=rotated.pdf'})
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/delete-pages', methods=['POST'])
+@cached_result('pages')
 def delete_pages():
     try:
-        file = request.files['file']
-        pages_to_delete = list(map(int, request.form.get('pages', '').split(',')))
+        file = request_document()
+        try:
+            pages_to_delete = PageSet(request.form.get('pages', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         result = PDFProcessor.delete_pages(file, pages_to_delete)
         return send_file(result, as_attachment=True, download_name='pages_deleted.pdf', 
                         mimetype='application/pdf')
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/compress-pdf', methods=['POST'])
+@cached_result('compression_level')
 def compress_pdf():
     try:
-        file = request.files['file']
-        result = PDFProcessor.compress_pdf(file)
-        return send_file(result, as_attachment=True, download_name='compressed.pdf', 
-                        mimetype='application/pdf')
+        file = request_document()
+        level = request.form.get('compression_level', DEFAULT_COMPRESSION_LEVEL).strip().lower()
+        level = COMPRESSION_LEVEL_ALIASES.get(level, level)
+        if level not in COMPRESSION_LEVELS:
+            return jsonify({'error': f'Invalid compression level: {level}'}), 400
+        
+        result = PDFProcessor.compress_pdf(file, level)
+        response = send_file(result, as_attachment=True, download_name='compressed.pdf', 
+                             mimetype='application/pdf')
+        response.headers['X-Original-Size'] = str(len(file.data))
+        response.headers['X-Compressed-Size'] = str(result.getbuffer().nbytes)
+        return response
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/unlock-pdf', methods=['POST'])
 def unlock_pdf():
     try:
-        if 'file' not in request.files:
+        if 'file' not in request.files and not request.form.get('document'):
             return jsonify({'error': 'No file provided'}), 400
             
-        file = request.files['file']
+        file = request_document()
         password = request.form.get('password', '').strip()
         
         if not password:
@@ -860,13 +3501,18 @@ def unlock_pdf():
         result = PDFProcessor.unlock_pdf(file, password)
         return send_file(result, as_attachment=True, download_name='unlocked.pdf', 
                         mimetype='application/pdf')
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/protect-pdf', methods=['POST'])
 def protect_pdf():
     try:
-        file = request.files['file']
+        # `password` is the new password; an already protected upload is opened with `current_password`
+        file = request_document('current_password')
         password = request.form.get('password', '').strip()
         owner_password = request.form.get('owner_password', '').strip()
         
@@ -876,10 +3522,51 @@ def protect_pdf():
         result = PDFProcessor.protect_pdf(file, password, owner_password if owner_password else None)
         return send_file(result, as_attachment=True, download_name='protected.pdf', 
                         mimetype='application/pdf')
+    except DocumentNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch/<operation>', methods=['POST'])
+def batch(operation):
+    import shutil
+    try:
+        if operation not in BATCH_OPERATIONS:
+            return jsonify({'error': f'Unknown batch operation: {operation}'}), 404
+        
+        files = request.files.getlist('files')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        password = request.form.get('password', '').strip()
+        owner_password = request.form.get('owner_password', '').strip() or None
+        try:
+            # Per-file passwords: {"statement-01.pdf": "secret"}
+            passwords = json.loads(request.form.get('passwords') or '{}')
+            if not isinstance(passwords, dict) or not all(isinstance(p, str) for p in passwords.values()):
+                raise ValueError("passwords must map file names to passwords")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not password and not passwords:
+            return jsonify({'error': 'A password is required'}), 400
+        
+        # Uploads are closed when the request ends, before the ZIP has been streamed;
+        # copy them to temp files that live as long as the response
+        spooled = []
+        for upload in files:
+            stream = tempfile.TemporaryFile()
+            shutil.copyfileobj(upload.stream, stream, 1024 * 1024)
+            spooled.append((upload.filename, stream))
+        
+        results = run_batch(operation, iter_batch_inputs(spooled), password, owner_password, passwords)
+        return Response(stream_with_context(stream_batch_zip(results)), mimetype='application/zip',
+                        headers={'Content-Disposition': f'attachment; filename={operation}.zip'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/word-to-pdf', methods=['POST'])
+@cached_result()
 def word_to_pdf():
     try:
         file = request.files['file']
@@ -890,6 +3577,7 @@ def word_to_pdf():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/excel-to-pdf', methods=['POST'])
+@cached_result()
 def excel_to_pdf():
     try:
         file = request.files['file']
@@ -899,9 +3587,68 @@ def excel_to_pdf():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<operation>', methods=['POST'])
+def submit_job(operation):
+    try:
+        from werkzeug.datastructures import FileStorage
+        
+        uploads = [f for name in request.files for f in request.files.getlist(name)]
+        if not uploads:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        # Protected PDFs are decrypted now so the password is never written to the job directory
+        params = request.form.to_dict()
+        password = params.pop('password', None)
+        if password and operation != 'word-to-pdf':
+            uploads = [FileStorage(ParsedDocument(upload, password).stream(), upload.filename)
+                       for upload in uploads]
+        
+        job_id = job_queue.submit(operation, uploads, params)
+        return jsonify({
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+            'result_url': f'/api/jobs/{job_id}/result'
+        }), 202
+    except InvalidPasswordError as e:
+        return jsonify({'error': str(e)}), 403
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        return jsonify(job_queue.status(job_id))
+    except KeyError:
+        return jsonify({'error': 'Job not found'}), 404
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    try:
+        path, download_name, mimetype = job_queue.result(job_id)
+        return send_file(path, as_attachment=True, download_name=download_name, mimetype=mimetype)
+    except KeyError:
+        return jsonify({'error': 'Job not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/status', methods=['GET'])
 def status():
-    return jsonify({'status': 'running', 'message': 'PDF Gears Python backend is active'})
+    return jsonify({
+        'status': 'running',
+        'message': 'PDF Gears Python backend is active',
+        'cache': result_cache.stats(),
+        'documents': document_store.stats()
+    })
 
 if __name__ == '__main__':
+    # Start the Word workers before the first request rather than during it. Only the reloader's
+    # child serves requests, so the watching parent does not start a pool of its own
+    if WORD_WORKERS > 1 and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        word_pool()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 import PyPDF2
 import io
@@ -14,6 +14,33 @@ from PIL import Image
 app = Flask(__name__)
 CORS(app)
 
+class ZipStream:
+    """Write-only sink for zipfile that hands back the bytes written so far"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(entries):
+    """Yield a ZIP archive chunk by chunk from (name, data) pairs"""
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, 'w') as zip_file:
+        for name, data in entries:
+            zip_file.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
+
 class PDFProcessor:
     
     @staticmethod
@@ -73,36 +100,28 @@ class PDFProcessor:
     
     @staticmethod
     def pdf_to_images(pdf_file, image_format='png', quality=2):
-        """Convert PDF pages to images"""
+        """Convert PDF pages to images, returning a generator of ZIP archive chunks"""
         try:
             pdf_document = fitz.open(stream=pdf_file.read(), filetype="pdf")
-            images = []
-            zoom_matrix = fitz.Matrix(quality, quality)
-            
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                pix = page.get_pixmap(matrix=zoom_matrix)
-                
-                if image_format.lower() == 'jpg':
-                    img_data = pix.tobytes("jpeg")
-                    ext = 'jpg'
-                else:
-                    img_data = pix.tobytes("png")
-                    ext = 'png'
-                
-                images.append((img_data, ext))
-            
-            pdf_document.close()
-            
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
-                for i, (img_data, ext) in enumerate(images):
-                    zip_file.writestr(f'page_{i+1}.{ext}', img_data)
-            
-            zip_buffer.seek(0)
-            return zip_buffer
         except Exception as e:
             raise Exception(f"Error converting PDF to images: {str(e)}")
+        
+        ext = 'jpg' if image_format.lower() == 'jpg' else 'png'
+        zoom_matrix = fitz.Matrix(quality, quality)
+        
+        def render_pages():
+            # Render one page at a time so only a single page is ever held in memory
+            try:
+                for page_num in range(len(pdf_document)):
+                    page = pdf_document.load_page(page_num)
+                    pix = page.get_pixmap(matrix=zoom_matrix)
+                    img_data = pix.tobytes("jpeg" if ext == 'jpg' else "png")
+                    pix = None
+                    yield f'page_{page_num+1}.{ext}', img_data
+            finally:
+                pdf_document.close()
+        
+        return stream_zip(render_pages())
     
     @staticmethod
     def images_to_pdf(image_files, page_size='letter', fit_mode='fit'):
@@ -193,8 +212,8 @@ def pdf_to_images():
         image_format = request.form.get('format', 'png')
         quality = int(request.form.get('quality', 2))
         result = PDFProcessor.pdf_to_images(file, image_format, quality)
-        return send_file(result, as_attachment=True, download_name='images.zip', 
-                        mimetype='application/zip')
+        return Response(stream_with_context(result), mimetype='application/zip',
+                        headers={'Content-Disposition': 'attachment; filename=images.zip'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
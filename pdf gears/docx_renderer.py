@@ -0,0 +1,582 @@
+"""Word (.docx) to PDF without an office suite: python-docx reads the document and reportlab
+platypus lays it out.
+
+DocxRenderer(data).render() returns (pdf_bytes, page_count). Fonts are looked up by family in the
+installed TrueType fonts, with metric-compatible substitutes for the common Office fonts.
+"""
+
+import contextlib
+import functools
+import io
+import os
+import re
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import nsmap as DOCX_NAMESPACES
+from docx.oxml.shared import qn
+from lxml import etree
+from PIL import Image
+from reportlab import platypus
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from xml.sax.saxutils import escape as xml_escape
+
+# TrueType fonts are looked up in FONT_DIRS (PDFGEARS_FONT_DIRS first, os.pathsep separated);
+# Office fonts that are not installed fall back to their metric-compatible substitutes, then to
+# a font of the same kind
+FONT_DIRS = [path for path in os.environ.get('PDFGEARS_FONT_DIRS', '').split(os.pathsep) if path] + [
+    '/usr/share/fonts', '/usr/local/share/fonts', os.path.expanduser('~/.fonts'),
+    '/Library/Fonts', '/System/Library/Fonts', r'C:\Windows\Fonts',
+]
+FONT_SUBSTITUTES = {
+    'calibri': ('carlito',),
+    'calibrilight': ('carlito',),
+    'cambria': ('caladea',),
+    'arial': ('liberationsans', 'arimo'),
+    'helvetica': ('liberationsans', 'arimo'),
+    'timesnewroman': ('liberationserif', 'tinos'),
+    'times': ('liberationserif', 'tinos'),
+    'couriernew': ('liberationmono', 'cousine'),
+    'courier': ('liberationmono', 'cousine'),
+}
+FONT_FALLBACKS = {
+    'sans': ('dejavusans', 'liberationsans', 'arial'),
+    'serif': ('dejavuserif', 'liberationserif', 'timesnewroman'),
+    'mono': ('dejavusansmono', 'liberationmono', 'couriernew'),
+}
+SERIF_FONTS = ('cambria', 'times', 'georgia', 'garamond', 'bookantiqua', 'palatino', 'caladea', 'serif')
+MONO_FONTS = ('courier', 'consolas', 'mono', 'lucidaconsole')
+# Base-14 fonts used when no TrueType font is installed at all: (regular, bold, italic, bold italic)
+STANDARD_FONTS = {
+    'sans': ('Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique'),
+    'serif': ('Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic'),
+    'mono': ('Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique'),
+}
+
+FONT_STYLE_SUFFIXES = {
+    (False, False): ('', 'regular', 'book', 'roman'),
+    (True, False): ('bold', 'bd', 'b'),
+    (False, True): ('italic', 'oblique', 'it', 'i'),
+    (True, True): ('bolditalic', 'boldoblique', 'bi', 'z'),
+}
+
+def _font_key(name):
+    return re.sub(r'[\s_\-]', '', name.lower())
+
+@functools.lru_cache(maxsize=None)
+def _font_files():
+    """Installed TrueType fonts by normalised file name ('DejaVuSans-Bold.ttf' -> 'dejavusansbold')"""
+    files = {}
+    for font_dir in FONT_DIRS:
+        for root, _, names in os.walk(font_dir):
+            for name in names:
+                stem, extension = os.path.splitext(name)
+                if extension.lower() == '.ttf':
+                    files.setdefault(_font_key(stem), os.path.join(root, name))
+    return files
+
+@functools.lru_cache(maxsize=None)
+def _pdf_font(family, bold=False, italic=False):
+    """reportlab font name for a Word font family, registering its TrueType file on first use.
+
+    Falls back through FONT_SUBSTITUTES and FONT_FALLBACKS, then to the nearest face those fonts
+    do have (bold for bold italic, then regular), then to a base-14 font.
+    """
+    key = _font_key(family or '')
+    if any(name in key for name in MONO_FONTS):
+        kind = 'mono'
+    elif any(name in key for name in SERIF_FONTS):
+        kind = 'serif'
+    else:
+        kind = 'sans'
+    candidates = (key,) + FONT_SUBSTITUTES.get(key, ()) + FONT_FALLBACKS[kind]
+    files = _font_files()
+
+    for style in dict.fromkeys([(bold, italic), (bold, False), (False, italic), (False, False)]):
+        for candidate in candidates:
+            for suffix in FONT_STYLE_SUFFIXES[style]:
+                path = files.get(candidate + suffix)
+                if not path:
+                    continue
+                name = os.path.splitext(os.path.basename(path))[0]
+                try:
+                    if name not in pdfmetrics.getRegisteredFontNames():
+                        pdfmetrics.registerFont(TTFont(name, path))
+                    return name
+                except Exception:
+                    # Collections and CFF-flavoured fonts cannot be embedded by reportlab
+                    continue
+    return STANDARD_FONTS[kind][bold + 2 * italic]
+
+@functools.lru_cache(maxsize=None)
+def _docx_xpath(path):
+    return etree.XPath(path, namespaces=DOCX_NAMESPACES)
+
+def _twips(value, default=0.0):
+    """Points from a WordprocessingML twentieth-of-a-point measure"""
+    try:
+        return int(value) / 20
+    except (TypeError, ValueError):
+        return default
+
+class DocxRenderer:
+    """Lay out a .docx with reportlab platypus: paragraphs and runs, lists, tables and images.
+
+    Properties are resolved straight from the XML, nearest first: direct formatting, the
+    numbering level, the style's basedOn chain, the table style, then the document defaults.
+    Headers, footers, floating text boxes and field results Word computes at print time
+    (page numbers, TOC entries) are not reproduced.
+    """
+
+    ALIGNMENTS = {'left': TA_LEFT, 'start': TA_LEFT, 'center': TA_CENTER, 'right': TA_RIGHT,
+                  'end': TA_RIGHT, 'both': TA_JUSTIFY, 'distribute': TA_JUSTIFY}
+    # Word's single line spacing is slightly taller than the font size
+    LINE_HEIGHT = 1.2
+    CELL_PADDING = 5.4
+    RUNS = ('./w:r | ./w:hyperlink/w:r | ./w:ins/w:r | ./w:smartTag/w:r | ./w:fldSimple/w:r'
+            ' | ./w:sdt/w:sdtContent/w:r')
+    FALSE_VALUES = ('0', 'false', 'off', 'none')
+
+    def __init__(self, data, timed=None):
+        self.document = Document(io.BytesIO(data))
+        # Stage timer, timed(stage) -> context manager; the server passes its metrics timer
+        self._timed = timed or (lambda stage: contextlib.nullcontext())
+        styles = self.document.styles.element
+        self._styles = {}
+        self._default_styles = {}
+        for style in styles.iterfind(qn('w:style')):
+            self._styles[style.get(qn('w:styleId'))] = style
+            if style.get(qn('w:default')) in ('1', 'true'):
+                self._default_styles[style.get(qn('w:type'))] = style
+        defaults = styles.find(qn('w:docDefaults'))
+        self._default_ppr = self._default_rpr = None
+        if defaults is not None:
+            self._default_ppr = defaults.find(f"{qn('w:pPrDefault')}/{qn('w:pPr')}")
+            self._default_rpr = defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}")
+        self._theme_fonts = self._read_theme_fonts()
+        self._numbering = self._read_numbering()
+        self._list_counters = {}
+        self._chains = {}
+        self._paragraph_styles = {}
+
+        section = self.document.sections[0]
+        self.page_size = (section.page_width.pt if section.page_width else letter[0],
+                          section.page_height.pt if section.page_height else letter[1])
+        self.margins = tuple(margin.pt if margin is not None else 72 for margin in (
+            section.left_margin, section.right_margin, section.top_margin, section.bottom_margin))
+        self.frame_width = self.page_size[0] - self.margins[0] - self.margins[1]
+        self.frame_height = self.page_size[1] - self.margins[2] - self.margins[3]
+
+    def render(self):
+        """Return (pdf_bytes, page_count)"""
+        output = io.BytesIO()
+        left, right, top, bottom = self.margins
+        properties = self.document.core_properties
+        template = platypus.SimpleDocTemplate(
+            output, pagesize=self.page_size, leftMargin=left, rightMargin=right, topMargin=top,
+            bottomMargin=bottom, title=properties.title or '', author=properties.author or '')
+        with self._timed('layout'):
+            story = self._blocks(self.document.element.body, self.frame_width)
+        with self._timed('write'):
+            template.build(story or [platypus.Spacer(1, 1)])
+        return output.getvalue(), template.page
+
+    # Property lookup
+
+    def _style_chain(self, style_id, kind):
+        """The style and its basedOn ancestors, nearest first"""
+        key = (style_id, kind)
+        if key not in self._chains:
+            chain = []
+            style = self._styles.get(style_id) if style_id else self._default_styles.get(kind)
+            while style is not None and style not in chain:
+                chain.append(style)
+                based_on = style.find(qn('w:basedOn'))
+                style = self._styles.get(based_on.get(qn('w:val'))) if based_on is not None else None
+            self._chains[key] = chain
+        return self._chains[key]
+
+    def _style_properties(self, style_id, kind, tag):
+        key = (style_id, kind, tag)
+        if key not in self._chains:
+            self._chains[key] = [style.find(qn(tag)) for style in self._style_chain(style_id, kind)]
+        return self._chains[key]
+
+    @staticmethod
+    def _attr(props, tag, attr='w:val'):
+        """The first value of attr on a tag child (or path, 'w:numPr/w:numId') of the property
+        elements, nearest first"""
+        tag, attr = '/'.join(qn(part) for part in tag.split('/')), qn(attr)
+        for element in props:
+            if element is not None:
+                found = element.find(tag)
+                if found is not None and found.get(attr) is not None:
+                    return found.get(attr)
+        return None
+
+    def _flag(self, props, tag):
+        """Resolve an on/off property such as w:b, which is on when present without a value"""
+        tag = qn(tag)
+        for element in props:
+            if element is not None:
+                found = element.find(tag)
+                if found is not None:
+                    return found.get(qn('w:val'), 'true').lower() not in self.FALSE_VALUES
+        return False
+
+    def _read_theme_fonts(self):
+        try:
+            theme = self.document.part.part_related_by(RT.THEME)
+        except KeyError:
+            return {}
+        drawing = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+        root = etree.fromstring(theme.blob)
+        fonts = {}
+        for kind in ('major', 'minor'):
+            latin = root.find(f'.//{drawing}{kind}Font/{drawing}latin')
+            if latin is not None and latin.get('typeface'):
+                fonts[kind] = latin.get('typeface')
+        return fonts
+
+    def _font_family(self, rprs):
+        for rpr in rprs:
+            fonts = rpr.find(qn('w:rFonts')) if rpr is not None else None
+            if fonts is None:
+                continue
+            theme = fonts.get(qn('w:asciiTheme'))
+            if theme:
+                return self._theme_fonts.get('major' if theme.startswith('major') else 'minor', 'Calibri')
+            if fonts.get(qn('w:ascii')):
+                return fonts.get(qn('w:ascii'))
+        return self._theme_fonts.get('minor', 'Calibri')
+
+    def _run_format(self, rprs):
+        """(font, size, color, underline, strike, vertical_align, caps, hidden) for a run"""
+        bold, italic = self._flag(rprs, 'w:b'), self._flag(rprs, 'w:i')
+        size = int(self._attr(rprs, 'w:sz') or 22) / 2
+        color = self._attr(rprs, 'w:color')
+        underline = (self._attr(rprs, 'w:u') or 'none') not in self.FALSE_VALUES
+        return (_pdf_font(self._font_family(rprs), bold, italic), size,
+                None if not color or color == 'auto' else '#' + color, underline,
+                self._flag(rprs, 'w:strike') or self._flag(rprs, 'w:dstrike'),
+                self._attr(rprs, 'w:vertAlign'), self._flag(rprs, 'w:caps'), self._flag(rprs, 'w:vanish'))
+
+    # Lists
+
+    def _read_numbering(self):
+        """{numId: {ilvl: (numFmt, lvlText, start, level pPr)}}"""
+        try:
+            numbering = self.document.part.numbering_part.element
+        except (KeyError, NotImplementedError):
+            return {}
+        abstract = {}
+        for definition in numbering.iterfind(qn('w:abstractNum')):
+            levels = {}
+            for level in definition.iterfind(qn('w:lvl')):
+                props = [level]
+                levels[int(level.get(qn('w:ilvl'), 0))] = (
+                    self._attr(props, 'w:numFmt') or 'decimal', self._attr(props, 'w:lvlText') or '',
+                    int(self._attr(props, 'w:start') or 1), level.find(qn('w:pPr')))
+            abstract[definition.get(qn('w:abstractNumId'))] = levels
+        instances = {}
+        for num in numbering.iterfind(qn('w:num')):
+            abstract_id = self._attr([num], 'w:abstractNumId')
+            if abstract_id in abstract:
+                instances[num.get(qn('w:numId'))] = abstract[abstract_id]
+        return instances
+
+    @staticmethod
+    def _number_text(number, number_format):
+        if number_format in ('lowerLetter', 'upperLetter'):
+            text = ''
+            while number > 0:
+                number, remainder = divmod(number - 1, 26)
+                text = chr(ord('a') + remainder) + text
+            return text.upper() if number_format == 'upperLetter' else text
+        if number_format in ('lowerRoman', 'upperRoman'):
+            text = ''
+            for value, numeral in ((1000, 'm'), (900, 'cm'), (500, 'd'), (400, 'cd'), (100, 'c'), (90, 'xc'),
+                                   (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'), (5, 'v'), (4, 'iv'), (1, 'i')):
+                count, number = divmod(number, value)
+                text += numeral * count
+            return text.upper() if number_format == 'upperRoman' else text
+        return str(number)
+
+    def _list_label(self, num_id, level):
+        """Advance the list counters and return the label for this item"""
+        levels = self._numbering[num_id]
+        number_format, text, start, _ = levels[level]
+        counters = self._list_counters.setdefault(num_id, {})
+        counters[level] = counters.get(level, start - 1) + 1
+        for deeper in [other for other in counters if other > level]:
+            del counters[deeper]
+
+        if number_format == 'none':
+            return ''
+        if number_format == 'bullet':
+            # Symbol and Wingdings bullets live in the private use area
+            return '\u2022' if not text or '\ue000' <= text[0] <= '\uf8ff' else text
+
+        def number(match):
+            index = int(match.group(1)) - 1
+            if index not in levels:
+                return ''
+            return self._number_text(counters.get(index, levels[index][2]), levels[index][0])
+        return re.sub(r'%(\d)', number, text)
+
+    # Layout
+
+    def _blocks(self, container, width, table_props=((), ())):
+        """Flowables for the paragraphs and tables in a body, cell or content control"""
+        flowables = []
+        for child in container.iterchildren():
+            if child.tag == qn('w:p'):
+                flowables.extend(self._paragraph(child, width, table_props))
+            elif child.tag == qn('w:tbl'):
+                flowables.append(self._table(child, width))
+            elif child.tag == qn('w:sdt'):
+                content = child.find(qn('w:sdtContent'))
+                if content is not None:
+                    flowables.extend(self._blocks(content, width, table_props))
+        return flowables
+
+    def _paragraph(self, p, width, table_props):
+        ppr = p.find(qn('w:pPr'))
+        style_id = self._attr([ppr], 'w:pStyle')
+        pprs = [ppr] + self._style_properties(style_id, 'paragraph', 'w:pPr')
+        paragraph_rprs = (self._style_properties(style_id, 'paragraph', 'w:rPr')
+                          + list(table_props[1]) + [self._default_rpr])
+
+        label = None
+        num_id = self._attr(pprs, 'w:numPr/w:numId')
+        level = int(self._attr(pprs, 'w:numPr/w:ilvl') or 0)
+        if num_id in self._numbering and level in self._numbering[num_id]:
+            label = self._list_label(num_id, level)
+            pprs = [ppr, self._numbering[num_id][level][3]] + pprs[1:]
+        pprs += list(table_props[0]) + [self._default_ppr]
+
+        flowables = []
+        if self._flag(pprs, 'w:pageBreakBefore'):
+            flowables.append(platypus.PageBreak())
+
+        base = self._run_format(paragraph_rprs)
+        markup, has_text = [], False
+
+        def flush(final=False):
+            nonlocal markup, has_text, label
+            if not markup and not final:
+                return
+            if not has_text:
+                markup = [self._font_markup(base, '&nbsp;')]
+            flowables.append(self._build_paragraph(''.join(markup), pprs, base, label))
+            markup, has_text, label = [], False, None
+
+        for run in _docx_xpath(self.RUNS)(p):
+            rprs = [run.find(qn('w:rPr'))]
+            char_style = self._attr(rprs, 'w:rStyle')
+            if char_style:
+                rprs += self._style_properties(char_style, 'character', 'w:rPr')
+            run_format = self._run_format(rprs + paragraph_rprs)
+            if run_format[7]:
+                continue
+
+            pieces = []
+            for child in run.iterchildren():
+                tag = child.tag
+                if tag == qn('w:t'):
+                    text = child.text or ''
+                    pieces.append(xml_escape(text.upper() if run_format[6] else text))
+                    has_text = has_text or bool(text)
+                elif tag == qn('w:tab'):
+                    pieces.append(' ' * 4)
+                elif tag == qn('w:noBreakHyphen'):
+                    pieces.append('-')
+                elif tag in (qn('w:br'), qn('w:cr')):
+                    if child.get(qn('w:type')) == 'page':
+                        if pieces:
+                            markup.append(self._font_markup(run_format, ''.join(pieces)))
+                            pieces = []
+                        flush()
+                        flowables.append(platypus.PageBreak())
+                    else:
+                        pieces.append('<br/>')
+                        has_text = True
+                elif tag == qn('w:drawing'):
+                    image = self._image(child, width, self._attr(pprs, 'w:jc'))
+                    if image is not None:
+                        if pieces:
+                            markup.append(self._font_markup(run_format, ''.join(pieces)))
+                            pieces = []
+                        flush()
+                        flowables.append(image)
+            if not pieces:
+                continue
+            text = self._font_markup(run_format, ''.join(pieces))
+            if run.getparent().tag == qn('w:hyperlink'):
+                target = self._hyperlink(run.getparent())
+                if target:
+                    text = f'<a href="{xml_escape(target, {chr(34): "&quot;"})}">{text}</a>'
+            markup.append(text)
+
+        if markup or not flowables or label is not None:
+            flush(final=True)
+        return flowables
+
+    def _hyperlink(self, hyperlink):
+        rel_id = hyperlink.get(qn('r:id'))
+        if rel_id and rel_id in self.document.part.rels:
+            relationship = self.document.part.rels[rel_id]
+            return relationship.target_ref if relationship.is_external else None
+        anchor = hyperlink.get(qn('w:anchor'))
+        return f'#{anchor}' if anchor else None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _font_open(run_format):
+        font, size, color, underline, strike, vertical_align = run_format[:6]
+        opening = f'<font face="{font}" size="{size:g}"' + (f' color="{color}"' if color else '') + '>'
+        closing = '</font>'
+        for enabled, tag in ((underline, 'u'), (strike, 'strike'),
+                             (vertical_align == 'superscript', 'super'), (vertical_align == 'subscript', 'sub')):
+            if enabled:
+                opening += f'<{tag}>'
+                closing = f'</{tag}>' + closing
+        return opening, closing
+
+    def _font_markup(self, run_format, text):
+        if not text:
+            return ''
+        opening, closing = self._font_open(run_format)
+        return opening + text + closing
+
+    def _build_paragraph(self, markup, pprs, base, label):
+        size = base[1]
+        line = self._attr(pprs, 'w:spacing', 'w:line')
+        rule = self._attr(pprs, 'w:spacing', 'w:lineRule') or 'auto'
+        leading = size * self.LINE_HEIGHT
+        if line and rule == 'auto':
+            leading *= int(line) / 240
+        elif line:
+            leading = _twips(line) if rule == 'exact' else max(leading, _twips(line))
+
+        left = _twips(self._attr(pprs, 'w:ind', 'w:left') or self._attr(pprs, 'w:ind', 'w:start'))
+        right = _twips(self._attr(pprs, 'w:ind', 'w:right') or self._attr(pprs, 'w:ind', 'w:end'))
+        hanging = self._attr(pprs, 'w:ind', 'w:hanging')
+        first_line = -_twips(hanging) if hanging else _twips(self._attr(pprs, 'w:ind', 'w:firstLine'))
+        bullet_indent = left + first_line
+        if label is not None:
+            first_line = 0
+
+        # Lines with larger runs grow to fit them, except under exact line spacing
+        auto_leading = '' if rule == 'exact' else 'max'
+        key = (base[0], size, round(leading, 2), auto_leading, self.ALIGNMENTS.get(self._attr(pprs, 'w:jc'), TA_LEFT),
+               _twips(self._attr(pprs, 'w:spacing', 'w:before')),
+               _twips(self._attr(pprs, 'w:spacing', 'w:after')), left, right, first_line, bullet_indent)
+        style = self._paragraph_styles.get(key)
+        if style is None:
+            font, size, leading, auto_leading, alignment, before, after, left, right, first_line, bullet_indent = key
+            style = ParagraphStyle(
+                f'docx{len(self._paragraph_styles)}', fontName=font, fontSize=size, leading=leading,
+                autoLeading=auto_leading, alignment=alignment, spaceBefore=before, spaceAfter=after, leftIndent=left,
+                rightIndent=right, firstLineIndent=first_line, bulletIndent=bullet_indent,
+                bulletFontName=font, bulletFontSize=size)
+            self._paragraph_styles[key] = style
+        return platypus.Paragraph(markup, style, bulletText=xml_escape(label) if label else None)
+
+    def _image(self, drawing, width, alignment):
+        blips = _docx_xpath('.//a:blip')(drawing)
+        extents = _docx_xpath('./*/wp:extent')(drawing)
+        rel_id = blips[0].get(qn('r:embed')) if blips else None
+        if not rel_id or not extents or rel_id not in self.document.part.related_parts:
+            return None
+        blob = self.document.part.related_parts[rel_id].blob
+        try:
+            # Word also embeds EMF/WMF, which neither PIL nor reportlab can draw
+            Image.open(io.BytesIO(blob)).verify()
+        except Exception:
+            return None
+        image_width = int(extents[0].get('cx', 0)) / 12700 or width
+        image_height = int(extents[0].get('cy', 0)) / 12700 or width
+        scale = min(1, width / image_width, self.frame_height / image_height)
+        return platypus.Image(io.BytesIO(blob), width=image_width * scale, height=image_height * scale,
+                              hAlign={'center': 'CENTER', 'right': 'RIGHT', 'end': 'RIGHT'}.get(alignment, 'LEFT'))
+
+    def _table(self, tbl, width):
+        tbl_pr = tbl.find(qn('w:tblPr'))
+        style_id = self._attr([tbl_pr], 'w:tblStyle')
+        table_props = (self._style_properties(style_id, 'table', 'w:pPr'),
+                       self._style_properties(style_id, 'table', 'w:rPr'))
+        tbl_prs = [tbl_pr] + self._style_properties(style_id, 'table', 'w:tblPr')
+
+        grid = [_twips(column.get(qn('w:w'))) for column in _docx_xpath('./w:tblGrid/w:gridCol')(tbl)]
+        rows = tbl.findall(qn('w:tr'))
+        if not rows:
+            return platypus.Spacer(0, 0)
+        columns = max([len(grid)] + [sum(int(self._attr([tc.find(qn('w:tcPr'))], 'w:gridSpan') or 1)
+                                         for tc in tr.findall(qn('w:tc'))) for tr in rows])
+        grid += [0] * (columns - len(grid))
+        if not all(grid):
+            missing = max(width - sum(grid), 0) / grid.count(0) or 36
+            grid = [column or missing for column in grid]
+        scale = min(1, width / sum(grid)) if grid else 1
+        col_widths = [column * scale for column in grid]
+
+        data, commands, spans, merge_starts, header_rows = [], [], {}, {}, 0
+        for r, tr in enumerate(rows):
+            tr_pr = tr.find(qn('w:trPr'))
+            if r == header_rows and self._flag([tr_pr], 'w:tblHeader'):
+                header_rows += 1
+            row = [''] * columns
+            col = int(self._attr([tr_pr], 'w:gridBefore') or 0)
+            for tc in tr.findall(qn('w:tc')):
+                if col >= columns:
+                    break
+                tc_pr = tc.find(qn('w:tcPr'))
+                span = min(int(self._attr([tc_pr], 'w:gridSpan') or 1), columns - col)
+                v_merge = tc_pr.find(qn('w:vMerge')) if tc_pr is not None else None
+                if v_merge is not None and v_merge.get(qn('w:val')) != 'restart' and col in merge_starts:
+                    start = merge_starts[col]
+                    spans[start] = (spans[start][0], r)
+                else:
+                    cell_width = sum(col_widths[col:col + span]) - 2 * self.CELL_PADDING
+                    row[col] = self._blocks(tc, cell_width, table_props) or ''
+                    spans[(col, r)] = (col + span - 1, r)
+                    if v_merge is not None:
+                        merge_starts[col] = (col, r)
+                    else:
+                        merge_starts.pop(col, None)
+                    fill = self._attr([tc_pr], 'w:shd', 'w:fill')
+                    if fill and fill != 'auto':
+                        commands.append(('BACKGROUND', (col, r), (col + span - 1, r), colors.HexColor('#' + fill)))
+                col += span
+            data.append(row)
+
+        for (col, r), (end_col, end_row) in spans.items():
+            if (end_col, end_row) != (col, r):
+                commands.append(('SPAN', (col, r), (end_col, end_row)))
+        borders = None
+        for element in tbl_prs:
+            borders = element.find(qn('w:tblBorders')) if element is not None else None
+            if borders is not None:
+                break
+        if borders is not None and any(border.get(qn('w:val')) not in ('nil', 'none') for border in borders):
+            commands.append(('GRID', (0, 0), (-1, -1), 0.5, colors.black))
+        commands += [('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                     ('LEFTPADDING', (0, 0), (-1, -1), self.CELL_PADDING),
+                     ('RIGHTPADDING', (0, 0), (-1, -1), self.CELL_PADDING),
+                     ('TOPPADDING', (0, 0), (-1, -1), 0), ('BOTTOMPADDING', (0, 0), (-1, -1), 0)]
+        alignment = {'center': 'CENTER', 'right': 'RIGHT', 'end': 'RIGHT'}.get(self._attr(tbl_prs, 'w:jc'), 'LEFT')
+        # splitInRow lets a row taller than a page continue on the next one, as it does in Word
+        return platypus.Table(data, colWidths=col_widths, repeatRows=min(header_rows, len(data) - 1),
+                              hAlign=alignment, style=commands, splitInRow=1)
+
+def warm_fonts(families):
+    """Register every style of the given font families ahead of the first document"""
+    for family in families:
+        for bold, italic in FONT_STYLE_SUFFIXES:
+            _pdf_font(family, bold, italic)
@@ -598,10 +598,10 @@ async function convertPdfToImage() {
         }
         
         const scanData = await scanResponse.json();
-        const pages = scanData.pages;
+        const pages = Array.from({length: scanData.page_count}, (_, i) => ({page_num: i + 1, preview: ''}));
         
-        // Show page selection dialog
-        const selectedPages = await showPageSelectionDialog(pages);
+        // Show page selection dialog (thumbnails load lazily by token)
+        const selectedPages = await showPageSelectionDialog(pages, scanData.token);
         if (!selectedPages || selectedPages.length === 0) return;
         
         // Get conversion options
@@ -609,30 +609,15 @@ async function convertPdfToImage() {
         if (!options) return;
         
         // Convert selected pages
+        // The scanned document is kept on the server, so refer to it instead of uploading again
         const convertFormData = new FormData();
-        convertFormData.append('file', file);
+        convertFormData.append('document', scanData.token);
         convertFormData.append('pages', selectedPages.join(','));
         convertFormData.append('format', options.format);
         convertFormData.append('quality', options.quality);
         
-        const convertResponse = await fetch(`${API_BASE_URL}/api/convert-pages`, {
-            method: 'POST',
-            body: convertFormData
-        });
-        
-        if (!convertResponse.ok) {
-            throw new Error('Failed to convert pages');
-        }
-        
-        const convertData = await convertResponse.json();
-        const images = convertData.images;
-        
-        // Process images for download
-        processedFiles = images.map(img => ({
-            name: img.filename,
-            url: `data:image/${options.format};base64,${img.data}`,
-            blob: dataURLtoBlob(`data:image/${options.format};base64,${img.data}`)
-        }));
+        // Page images come back as raw multipart parts instead of base64 JSON
+        processedFiles = await fetchPageFiles('/api/convert-pages', convertFormData);
         
     } catch (error) {
         console.error('Error converting PDF to images:', error);
@@ -805,24 +790,8 @@ async function splitPdfFile() {
         const formData = new FormData();
         formData.append('file', file);
         
-        const response = await fetch(`${API_BASE_URL}/api/split-pdf`, {
-            method: 'POST',
-            body: formData
-        });
-        
-        if (!response.ok) {
-            throw new Error('Failed to split PDF');
-        }
-        
-        const data = await response.json();
-        const pages = data.pages;
-        
         // Process pages for individual downloads
-        processedFiles = pages.map(page => ({
-            name: page.filename,
-            url: `data:application/pdf;base64,${page.data}`,
-            blob: dataURLtoBlob(`data:application/pdf;base64,${page.data}`)
-        }));
+        processedFiles = await fetchPageFiles('/api/split-pdf', formData);
         
     } catch (error) {
         console.error('Error splitting PDF:', error);
@@ -951,6 +920,51 @@ async function callPythonAPIForPages(endpoint, file, selectedPages, options) {
     return response;
 }
 
+// Fetch per-page files as a multipart/mixed response of raw bytes
+async function fetchPageFiles(endpoint, formData) {
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        method: 'POST',
+        headers: {'Accept': 'multipart/mixed'},
+        body: formData
+    });
+    
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.error || 'Processing failed');
+    }
+    
+    const boundary = response.headers.get('Content-Type').match(/boundary=([^;]+)/)[1];
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    const decoder = new TextDecoder('ascii');
+    const files = [];
+    let offset = 0;
+    
+    while (true) {
+        // Each part: --boundary, headers, blank line, Content-Length bytes, CRLF
+        const marker = decoder.decode(bytes.subarray(offset, offset + boundary.length + 4));
+        if (marker !== `--${boundary}\r\n`) break;
+        offset += boundary.length + 4;
+        
+        let headerEnd = offset;
+        while (!(bytes[headerEnd] === 13 && bytes[headerEnd + 1] === 10 &&
+                 bytes[headerEnd + 2] === 13 && bytes[headerEnd + 3] === 10)) {
+            headerEnd++;
+        }
+        const headers = decoder.decode(bytes.subarray(offset, headerEnd));
+        const type = headers.match(/Content-Type: (.*)/i)[1].trim();
+        const name = headers.match(/filename="([^"]+)"/i)[1];
+        const length = parseInt(headers.match(/Content-Length: (\d+)/i)[1], 10);
+        
+        offset = headerEnd + 4;
+        const blob = new Blob([bytes.subarray(offset, offset + length)], {type: type});
+        offset += length + 2;
+        
+        files.push({name: name, blob: blob, url: URL.createObjectURL(blob)});
+    }
+    
+    return files;
+}
+
 // Helper function to convert data URL to blob
 function dataURLtoBlob(dataURL) {
     const arr = dataURL.split(',');
@@ -1236,7 +1250,10 @@ function showDeletePagesDialog() {
 }
 
 // Show page selection dialog
-function showPageSelectionDialog(pages) {
+// Thumbnails are fetched from the server in ranges of this many pages
+const THUMBNAIL_BATCH_SIZE = 24;
+
+function showPageSelectionDialog(pages, token) {
     return new Promise((resolve) => {
         const dialog = document.createElement('div');
         dialog.style.cssText = `position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0,0,0,0.5); display: flex; align-items: center; justify-content: center; z-index: 2000;`;
@@ -1263,6 +1280,30 @@ function showPageSelectionDialog(pages) {
         
         document.body.appendChild(dialog);
         
+        // Load thumbnails a range at a time as they scroll into view
+        if (token) {
+            const requestedBatches = new Set();
+            const observer = new IntersectionObserver(entries => {
+                entries.filter(entry => entry.isIntersecting).forEach(entry => {
+                    const pageNum = parseInt(entry.target.parentElement.dataset.page);
+                    const batch = Math.floor((pageNum - 1) / THUMBNAIL_BATCH_SIZE);
+                    if (requestedBatches.has(batch)) return;
+                    requestedBatches.add(batch);
+                    
+                    const from = batch * THUMBNAIL_BATCH_SIZE + 1;
+                    const to = from + THUMBNAIL_BATCH_SIZE - 1;
+                    fetch(`${API_BASE_URL}/api/thumbnails/${token}?from=${from}&to=${to}`)
+                        .then(response => response.json())
+                        .then(data => (data.pages || []).forEach(page => {
+                            const img = dialog.querySelector(`.page-item[data-page="${page.page_num}"] img`);
+                            if (img) img.src = page.preview;
+                        }))
+                        .catch(error => console.error('Error loading thumbnails:', error));
+                });
+            });
+            dialog.querySelectorAll('.page-item img').forEach(img => observer.observe(img));
+        }
+        
         // Add click handlers for page selection
         dialog.querySelectorAll('.page-item img').forEach(img => {
             img.onclick = () => {
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import fitz
+import pytest
+
+# The backend modules live next to this folder rather than in an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the server's cache and job store away from a running instance's directories
+_state_dir = tempfile.mkdtemp(prefix='pdfgears-tests-')
+os.environ.setdefault('PDFGEARS_CACHE_DIR', os.path.join(_state_dir, 'cache'))
+os.environ.setdefault('PDFGEARS_JOB_DIR', os.path.join(_state_dir, 'jobs'))
+
+
+@pytest.fixture
+def make_pdf():
+    """Build a small text PDF with 'Page N' on each page"""
+    def make(pages=3):
+        document = fitz.open()
+        for number in range(1, pages + 1):
+            document.new_page().insert_text((72, 72), f'Page {number}', fontsize=12)
+        data = document.tobytes()
+        document.close()
+        return data
+    return make
+
+
+@pytest.fixture
+def client():
+    import app
+    return app.app.test_client()
@@ -0,0 +1,119 @@
+"""Smoke tests for the Word to PDF layout engine"""
+
+import io
+
+import fitz
+import pytest
+from docx import Document
+from docx.shared import Inches
+from PIL import Image
+
+from docx_renderer import DocxRenderer
+
+
+def render(document):
+    data = io.BytesIO()
+    document.save(data)
+    pdf_data, page_count = DocxRenderer(data.getvalue()).render()
+    pdf = fitz.open(stream=pdf_data, filetype='pdf')
+    assert len(pdf) == page_count
+    return pdf, ''.join(page.get_text() for page in pdf)
+
+
+def words(text):
+    return ' '.join(text.split())
+
+
+def test_paragraphs_and_runs():
+    document = Document()
+    document.add_heading('Quarterly report', level=1)
+    paragraph = document.add_paragraph('Plain, ')
+    paragraph.add_run('bold').bold = True
+    paragraph.add_run(' and ')
+    paragraph.add_run('italic & <escaped>').italic = True
+    document.add_paragraph('First point', style='List Bullet')
+    document.add_paragraph('Second point', style='List Bullet')
+
+    pdf, text = render(document)
+    assert len(pdf) == 1
+    for expected in ('Quarterly report', 'Plain, bold and italic & <escaped>', 'First point', 'Second point'):
+        assert expected in words(text)
+
+
+def test_table():
+    document = Document()
+    table = document.add_table(rows=3, cols=3)
+    table.style = 'Table Grid'
+    for row_index, row in enumerate(table.rows):
+        for column_index, cell in enumerate(row.cells):
+            cell.text = f'r{row_index}c{column_index}'
+    table.cell(2, 0).merge(table.cell(2, 1))
+
+    pdf, text = render(document)
+    for row_index in range(2):
+        for column_index in range(3):
+            assert f'r{row_index}c{column_index}' in text
+    assert 'r2c2' in text
+
+
+def test_nested_table():
+    document = Document()
+    outer = document.add_table(rows=1, cols=2)
+    outer.cell(0, 0).text = 'outer cell'
+    inner = outer.cell(0, 1).add_table(rows=2, cols=2)
+    for row_index, row in enumerate(inner.rows):
+        for column_index, cell in enumerate(row.cells):
+            cell.text = f'inner {row_index}{column_index}'
+
+    pdf, text = render(document)
+    assert 'outer cell' in text
+    for cell in ('inner 00', 'inner 01', 'inner 10', 'inner 11'):
+        assert cell in text
+
+
+def test_image():
+    image = io.BytesIO()
+    Image.new('RGB', (320, 200), (30, 90, 200)).save(image, 'PNG')
+    image.seek(0)
+    document = Document()
+    document.add_paragraph('Before the picture')
+    document.add_picture(image, width=Inches(3))
+    document.add_paragraph('After the picture')
+
+    pdf, text = render(document)
+    assert 'Before the picture' in text and 'After the picture' in text
+    images = pdf[0].get_images()
+    assert len(images) == 1
+    width = pdf[0].get_image_rects(images[0][0])[0].width
+    assert width == pytest.approx(3 * 72, abs=1)
+
+
+def test_row_taller_than_a_page_splits_across_pages():
+    document = Document()
+    table = document.add_table(rows=1, cols=2)
+    table.style = 'Table Grid'
+    sentence = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. '
+    table.cell(0, 0).text = sentence * 60 + 'end of the first cell'
+    table.cell(0, 1).text = sentence * 120 + 'end of the second cell'
+    inner = table.cell(0, 0).add_table(rows=40, cols=1)
+    for index, row in enumerate(inner.rows):
+        row.cells[0].text = f'nested row {index}'
+
+    pdf, text = render(document)
+    assert len(pdf) > 1
+    text = words(text)
+    assert 'end of the first cell' in text
+    assert 'end of the second cell' in text
+    assert 'nested row 0' in text and 'nested row 39' in text
+    assert text.count('Lorem ipsum') == 180
+
+
+def test_empty_document():
+    pdf, text = render(Document())
+    assert len(pdf) == 1
+    assert not text.strip()
+
+
+def test_not_a_docx():
+    with pytest.raises(Exception):
+        DocxRenderer(b'not a zip file')
@@ -0,0 +1,152 @@
+"""JobQueue state handling and the /api/jobs routes"""
+
+import io
+import json
+import os
+import threading
+import time
+
+import fitz
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app import JobQueue
+
+
+def upload(data, name='input'):
+    return FileStorage(io.BytesIO(data), name)
+
+
+def wait(queue, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.status(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def upper(inputs, params, progress):
+    progress(0, len(inputs))
+    chunks = []
+    for i, data in enumerate(inputs):
+        chunks.append(data.upper())
+        progress(i + 1, len(inputs))
+    return iter(chunks), params.get('name', 'out.txt'), 'text/plain'
+
+
+def broken(inputs, params, progress):
+    raise Exception('Error converting: broken input')
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path), 2, 60, {'upper': upper, 'broken': broken})
+
+
+def test_finished_job_has_progress_and_result(queue, tmp_path):
+    job_id = queue.submit('upper', [upload(b'ab'), upload(b'cd')], {'name': 'x.txt'})
+    job = wait(queue, job_id)
+    assert job['status'] == 'done'
+    assert job['progress'] == {'done': 2, 'total': 2}
+    assert job['error'] is None
+    assert job['finished'] >= job['created']
+    path, download_name, mimetype = queue.result(job_id)
+    with open(path, 'rb') as f:
+        assert f.read() == b'ABCD'
+    assert (download_name, mimetype) == ('x.txt', 'text/plain')
+    # Inputs are removed once the job has run
+    assert sorted(os.listdir(tmp_path / job_id)) == ['job.json', 'result']
+
+
+def test_failed_job_records_the_error(queue):
+    job_id = queue.submit('broken', [upload(b'ab')], {})
+    job = wait(queue, job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Error converting: broken input'
+    with pytest.raises(ValueError):
+        queue.result(job_id)
+
+
+def test_unknown_operation_and_job(queue):
+    with pytest.raises(ValueError):
+        queue.submit('nope', [upload(b'ab')], {})
+    with pytest.raises(KeyError):
+        queue.status('0' * 32)
+    # Ids that could escape the job directory are rejected
+    with pytest.raises(KeyError):
+        queue.status('../etc')
+
+
+def test_interrupted_jobs_are_requeued_on_start(tmp_path):
+    job_id = 'a' * 32
+    job_dir = tmp_path / job_id
+    job_dir.mkdir()
+    (job_dir / 'input-0').write_bytes(b'ab')
+    (job_dir / 'job.json').write_text(json.dumps({
+        'id': job_id, 'operation': 'upper', 'params': {}, 'inputs': 1, 'status': 'running',
+        'progress': {'done': 0, 'total': 1}, 'error': None, 'created': time.time(), 'finished': None,
+    }))
+    queue = JobQueue(str(tmp_path), 1, 60, {'upper': upper})
+    assert wait(queue, job_id)['status'] == 'done'
+    with open(queue.result(job_id)[0], 'rb') as f:
+        assert f.read() == b'AB'
+
+
+def test_expired_jobs_are_purged_on_submit(queue, tmp_path):
+    old_id = queue.submit('upper', [upload(b'ab')], {})
+    wait(queue, old_id)
+    job_path = tmp_path / old_id / 'job.json'
+    job = json.loads(job_path.read_text())
+    job['finished'] -= 120
+    job_path.write_text(json.dumps(job))
+    new_id = queue.submit('upper', [upload(b'cd')], {})
+    assert not (tmp_path / old_id).exists()
+    assert wait(queue, new_id)['status'] == 'done'
+
+
+def test_workers_bound_concurrent_jobs(tmp_path):
+    running = []
+    peak = []
+    release = threading.Event()
+
+    def slow(inputs, params, progress):
+        running.append(1)
+        peak.append(len(running))
+        release.wait(5)
+        running.pop()
+        return [b''], 'out', 'text/plain'
+
+    queue = JobQueue(str(tmp_path), 2, 60, {'slow': slow})
+    job_ids = [queue.submit('slow', [upload(b'')], {}) for _ in range(4)]
+    time.sleep(0.1)
+    assert [queue.status(j)['status'] for j in job_ids].count('queued') == 2
+    release.set()
+    assert all(wait(queue, j)['status'] == 'done' for j in job_ids)
+    assert max(peak) == 2
+
+
+def test_compress_job_route(client, make_pdf):
+    response = client.post('/api/jobs/compress-pdf',
+                           data={'file': (io.BytesIO(make_pdf(2)), 'a.pdf'), 'compression_level': 'low'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    status_url, result_url = response.json['status_url'], response.json['result_url']
+    deadline = time.time() + 30
+    while client.get(status_url).json['status'] not in ('done', 'failed') and time.time() < deadline:
+        time.sleep(0.05)
+    assert client.get(status_url).json['status'] == 'done'
+    result = client.get(result_url)
+    assert result.status_code == 200
+    assert result.headers['Content-Type'] == 'application/pdf'
+    with fitz.open(stream=result.data, filetype='pdf') as document:
+        assert document.page_count == 2
+
+
+def test_job_routes_reject_unknown_jobs(client):
+    assert client.post('/api/jobs/nope', data={'file': (io.BytesIO(b'x'), 'a.pdf')},
+                       content_type='multipart/form-data').status_code == 400
+    assert client.post('/api/jobs/compress-pdf').status_code == 400
+    assert client.get('/api/jobs/' + '0' * 32).status_code == 404
+    assert client.get('/api/jobs/' + '0' * 32 + '/result').status_code == 404
@@ -0,0 +1,101 @@
+"""PageSet parsing and the order of page selections"""
+
+import base64
+import io
+
+import fitz
+import pytest
+
+from app import PageSet
+
+
+def pages(spec, page_count=10, **kwargs):
+    return list(PageSet(spec).pages(page_count, **kwargs))
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('3', [3]),
+    ('2-4', [2, 3, 4]),
+    ('8-', [8, 9, 10]),
+    ('-3', [1, 2, 3]),
+    ('odd', [1, 3, 5, 7, 9]),
+    ('even', [2, 4, 6, 8, 10]),
+    ('last', [10]),
+    ('last-3', [8, 9, 10]),
+    (' 1 , 3-4 ', [1, 3, 4]),
+    ('LAST', [10]),
+])
+def test_terms(spec, expected):
+    assert pages(spec) == expected
+
+
+@pytest.mark.parametrize('spec', ['', ',', '-', '0', '4-2', 'x', '1-2-3', 'last-', 'first', '1;2'])
+def test_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        PageSet(spec)
+
+
+def test_selection_keeps_request_order_without_duplicates():
+    assert pages('5,1-3') == [5, 1, 2, 3]
+    assert pages('last,1,last-2,2') == [10, 1, 9, 2]
+    assert pages('2-4,3-5,odd') == [2, 3, 4, 5, 1, 7, 9]
+
+
+def test_sorted_pages():
+    assert pages('5,1-3', sorted_pages=True) == [1, 2, 3, 5]
+    assert pages('even,odd', sorted_pages=True) == list(range(1, 11))
+    assert pages('odd,4-6', sorted_pages=True) == [1, 3, 4, 5, 6, 7, 9]
+
+
+def test_pages_past_the_end_are_ignored():
+    assert pages('4,20,9-30', page_count=10) == [4, 9, 10]
+    assert pages('20-', page_count=10) == []
+    assert pages('last-30', page_count=3) == [1, 2, 3]
+
+
+def test_ranges_are_merged_and_sorted():
+    assert PageSet('7-9,1-3,4,20').ranges(10) == [range(1, 5), range(7, 10)]
+    assert PageSet('odd,2').ranges(6) == [range(2, 3), range(1, 7, 2)]
+    assert PageSet('odd,even').ranges(4) == [range(1, 5)]
+
+
+def test_large_ranges_are_not_expanded():
+    selection = PageSet('1-1000000000')
+    assert selection.ranges(10 ** 9) == [range(1, 10 ** 9 + 1)]
+    assert next(iter(selection.pages(10 ** 9))) == 1
+
+
+def test_of_accepts_page_lists():
+    assert list(PageSet.of([3, 1]).pages(5)) == [3, 1]
+    selection = PageSet('1')
+    assert PageSet.of(selection) is selection
+
+
+def test_selected_pages_come_back_in_request_order(client, make_pdf):
+    response = client.post('/api/convert-selected-pdf-pages',
+                           data={'file': (io.BytesIO(make_pdf(5)), 'a.pdf'), 'pages': '4,2,last'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    entries = response.json['pdfs']
+    assert [entry['page_num'] for entry in entries] == [4, 2, 5]
+    texts = []
+    for entry in entries:
+        with fitz.open(stream=base64.b64decode(entry['data']), filetype='pdf') as document:
+            texts.append(document[0].get_text().strip())
+    assert texts == ['Page 4', 'Page 2', 'Page 5']
+
+
+def test_deleted_pages_ignore_order(client, make_pdf):
+    response = client.post('/api/delete-pages',
+                           data={'file': (io.BytesIO(make_pdf(5)), 'a.pdf'), 'pages': '4,2,4'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    with fitz.open(stream=response.get_data(), filetype='pdf') as document:
+        assert [page.get_text().strip() for page in document] == ['Page 1', 'Page 3', 'Page 5']
+
+
+def test_invalid_page_spec_is_a_bad_request(client, make_pdf):
+    response = client.post('/api/convert-pages',
+                           data={'file': (io.BytesIO(make_pdf(2)), 'a.pdf'), 'pages': '3-1'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
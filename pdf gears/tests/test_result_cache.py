@@ -0,0 +1,176 @@
+"""ResultCache tiers and the cached_result route decorator"""
+
+import io
+import time
+import zipfile
+
+import fitz
+
+from app import ResultCache
+
+
+def upload(data):
+    return io.BytesIO(data)
+
+
+def test_key_covers_bytes_operation_and_params():
+    key = ResultCache.key('compress', [upload(b'one')], {'level': 'balanced'})
+    assert key == ResultCache.key('compress', [upload(b'one')], {'level': 'balanced'})
+    assert key != ResultCache.key('compress', [upload(b'two')], {'level': 'balanced'})
+    assert key != ResultCache.key('compress', [upload(b'one')], {'level': 'aggressive'})
+    assert key != ResultCache.key('split', [upload(b'one')], {'level': 'balanced'})
+    # Upload boundaries are part of the key
+    assert (ResultCache.key('merge', [upload(b'ab'), upload(b'c')], {})
+            != ResultCache.key('merge', [upload(b'a'), upload(b'bc')], {}))
+
+
+def test_key_leaves_uploads_rewound():
+    data = upload(b'payload')
+    ResultCache.key('compress', [data], {})
+    assert data.read() == b'payload'
+
+
+def test_memory_hit(tmp_path):
+    cache = ResultCache(1024, 0, 60, str(tmp_path))
+    assert cache.get('k') is None
+    cache.put('k', b'result', {'content_type': 'application/pdf'})
+    assert cache.get('k') == (b'result', {'content_type': 'application/pdf'})
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['memory_entries'] == 1
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(10, 0, 60, str(tmp_path))
+    cache.put('a', b'aaaa', {})
+    cache.put('b', b'bbbb', {})
+    cache.get('a')
+    cache.put('c', b'cccc', {})
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['memory_bytes'] == 8
+
+
+def test_large_entries_only_go_to_disk(tmp_path):
+    cache = ResultCache(4, 1024, 60, str(tmp_path))
+    cache.put('k', b'larger than memory', {'n': 1})
+    assert cache.stats()['memory_entries'] == 0
+    assert cache.get('k') == (b'larger than memory', {'n': 1})
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ResultCache(0, 1024, 60, str(tmp_path)).put('k', b'kept', {'n': 1})
+    cache = ResultCache(0, 1024, 60, str(tmp_path))
+    assert cache.stats()['disk_entries'] == 1
+    assert cache.get('k') == (b'kept', {'n': 1})
+
+
+def test_disk_tier_stays_within_budget(tmp_path):
+    cache = ResultCache(0, 10, 60, str(tmp_path))
+    cache.put('a', b'aaaaaa', {})
+    cache.put('b', b'bbbbbb', {})
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+    assert cache.stats()['disk_bytes'] == 6
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['b.bin', 'b.json']
+
+
+def test_entries_expire(tmp_path):
+    cache = ResultCache(1024, 1024, 0.05, str(tmp_path))
+    cache.put('k', b'short lived', {})
+    time.sleep(0.1)
+    assert cache.get('k') is None
+    assert cache.stats()['expired'] >= 1
+    assert not list(tmp_path.iterdir())
+
+
+def test_route_results_are_served_from_the_cache(client, make_pdf):
+    pdf = make_pdf(2)
+    first = client.post('/api/compress-pdf', data={'file': (upload(pdf), 'a.pdf'), 'compression_level': 'lossless'},
+                        content_type='multipart/form-data')
+    second = client.post('/api/compress-pdf', data={'file': (upload(pdf), 'b.pdf'), 'compression_level': 'low'},
+                         content_type='multipart/form-data')
+    assert first.status_code == second.status_code == 200
+    assert first.headers['X-Cache'] == 'MISS'
+    # 'low' is an alias of 'lossless', so the request shares the cache entry
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.data == first.data
+    assert second.headers['X-Compressed-Size'] == first.headers['X-Compressed-Size']
+
+
+def test_password_protected_results_are_never_cached(client, make_pdf):
+    pdf = fitz.open(stream=make_pdf(2)).tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, user_pw='secret',
+                                                 owner_pw='owner')
+    for _ in range(2):
+        response = client.post('/api/unlock-pdf', data={'file': (upload(pdf), 'a.pdf'), 'password': 'secret'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert 'X-Cache' not in response.headers
+        assert not fitz.open(stream=response.data).needs_pass
+
+
+class Chunks:
+    """An iterable response body that records whether it was closed"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self.closed = True
+
+
+def test_store_stream_spools_a_complete_response(tmp_path):
+    cache = ResultCache(0, 1024, 60, str(tmp_path))
+    chunks = Chunks([b'first ', b'second'])
+    assert b''.join(cache.store_stream('k', chunks, {'n': 1})) == b'first second'
+    assert chunks.closed
+    assert cache.get('k') == (b'first second', {'n': 1})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['k.bin', 'k.json']
+
+
+def test_store_stream_drops_an_interrupted_response(tmp_path):
+    cache = ResultCache(0, 1024, 60, str(tmp_path))
+    chunks = Chunks([b'first ', b'second'])
+    stream = cache.store_stream('k', chunks, {})
+    assert next(stream) == b'first '
+    assert len(list(tmp_path.iterdir())) == 1
+    # The client went away before the end
+    stream.close()
+    assert chunks.closed
+    assert cache.get('k') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_store_stream_passes_oversized_responses_through(tmp_path):
+    cache = ResultCache(0, 8, 60, str(tmp_path))
+    assert b''.join(cache.store_stream('k', Chunks([b'12345', b'67890']), {})) == b'1234567890'
+    assert cache.get('k') is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_leftover_spool_files_are_removed_on_startup(tmp_path):
+    (tmp_path / 'k.bin.1234.tmp').write_bytes(b'partial')
+    ResultCache(0, 1024, 60, str(tmp_path))
+    assert not list(tmp_path.iterdir())
+
+
+def test_streamed_route_results_are_cached(client, make_pdf):
+    pdf = make_pdf(3)
+    bodies = []
+    for expected in ('MISS', 'HIT'):
+        response = client.post('/api/pdf-to-images', data={'file': (upload(pdf), 'a.pdf'), 'format': 'jpg'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == expected
+        # The entry is only committed once the whole body has been sent
+        bodies.append(response.get_data())
+    assert bodies[0] == bodies[1]
+    with zipfile.ZipFile(io.BytesIO(bodies[1])) as archive:
+        assert archive.namelist() == ['page_1.jpg', 'page_2.jpg', 'page_3.jpg']